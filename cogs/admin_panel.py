@@ -4,7 +4,7 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 
-from utils.config import load_config, save_config
+from utils.config import load_config, save_config, get_int
 from utils.perm import is_admin_member
 
 
@@ -72,10 +72,10 @@ class ExonerarAdminModal(discord.ui.Modal, title="Exonerar (Admin)"):
         )
 
         # log to exonerados
-        ex_ch_id = int(cfg.get("exoneracao", {}).get("channel_exonerados_id", 0))
+        ex_ch_id = get_int("exoneracao", "channel_exonerados_id")
         if ex_ch_id:
             try:
-                ex_ch = await interaction.guild.fetch_channel(ex_ch_id)
+                ex_ch = await self.cog.bot.channel_registry.resolve(interaction.guild, ex_ch_id)
             except Exception:
                 ex_ch = None
             if isinstance(ex_ch, discord.TextChannel):
@@ -169,7 +169,7 @@ class AnuncioAdminModal(discord.ui.Modal, title="Anúncio"):
             return await interaction.followup.send("❌ ID do canal inválido.", ephemeral=True)
 
         try:
-            ch = await interaction.guild.fetch_channel(ch_id)
+            ch = await self.cog.bot.channel_registry.resolve(interaction.guild, ch_id)
         except Exception:
             ch = None
         if not isinstance(ch, discord.TextChannel):
@@ -278,7 +278,7 @@ class AdvModal(discord.ui.Modal, title="Aplicar Advertência (ADV)"):
         ch_id = _get_punicao_channel_id(cfg)
         if ch_id:
             try:
-                ch = await guild.fetch_channel(int(ch_id))
+                ch = await self.cog.bot.channel_registry.resolve(guild, int(ch_id))
             except Exception:
                 ch = None
             if isinstance(ch, discord.TextChannel):
@@ -450,7 +450,7 @@ class RevogarSelect(discord.ui.Select):
         ch_id = _get_punicao_channel_id(cfg)
         if ch_id:
             try:
-                ch = await guild.fetch_channel(int(ch_id))
+                ch = await self.cog.bot.channel_registry.resolve(guild, int(ch_id))
             except Exception:
                 ch = None
             if isinstance(ch, discord.TextChannel):
@@ -565,12 +565,12 @@ class AdminPanelCog(commands.Cog):
         except Exception:
             pass
 
-        ch_id = int(cfg.get("admin_panel", {}).get("panel_channel_id", 0))
+        ch_id = get_int("admin_panel", "panel_channel_id")
         if ch_id == 0:
             return await interaction.followup.send("❌ Configure `admin_panel.panel_channel_id` no config.json.", ephemeral=True)
 
         try:
-            ch = await interaction.guild.fetch_channel(ch_id)
+            ch = await self.bot.channel_registry.resolve(interaction.guild, ch_id)
         except Exception:
             ch = None
         if not isinstance(ch, discord.TextChannel):
@@ -590,7 +590,7 @@ class AdminPanelCog(commands.Cog):
         )
         embed.set_footer(text="Ações restritas a ADM")
 
-        panel_message_id = int(cfg.get("admin_panel", {}).get("panel_message_id", 0))
+        panel_message_id = get_int("admin_panel", "panel_message_id")
         msg = None
         if panel_message_id:
             try:
@@ -1,6 +1,11 @@
 from __future__ import annotations
 
+import asyncio
+import gzip
+import io
 import json
+import logging
+import random
 import re
 from datetime import datetime, timedelta, timezone
 from typing import Optional, List, Dict
@@ -9,46 +14,197 @@ import discord
 from discord.ext import commands, tasks
 from discord import app_commands
 
-from utils.config import load_config, save_config
+from utils.background import TaskSet
+from utils.config import load_config, save_config, get_int, get_int_list, get_bool, get_float
+from utils.journal import SubmissionJournal
+from utils.outbound import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, with_retries
 from utils.perm import is_admin_member
-from utils.timeutils import utcnow, parse_iso, start_of_day, start_of_week, start_of_month, start_of_year
+from utils.prison_codec import decode_record, encode_record, epoch_of
+from utils.prison_db import MIRROR_TYPES, TYPE_PRISAO, TYPE_REVOGACAO, PrisonMirror, record_epoch, record_id
+from utils.rank_engine import RecordArrays, bucket_counts, period_summary
+from utils.ranking import RankCounters
+from utils.timeutils import utcnow, parse_iso, start_of_day, start_of_year
 
-
-
-def _pack_record(d: dict) -> str:
-    return "```json\n" + json.dumps(d, ensure_ascii=False) + "\n```"
+log = logging.getLogger(__name__)
 
 
 def _unpack_record(content: str) -> Optional[dict]:
+    """Formato antigo: uma mensagem ```json por registro."""
     content = (content or "").strip()
+    if content.startswith(DB_PACK_HEADER):
+        return None
     if content.startswith("```json"):
         content = content[len("```json"):].strip()
     if content.startswith("```"):
         content = content[3:].strip()
     if content.endswith("```"):
         content = content[:-3].strip()
+    return decode_record(content)
+
+
+# =====================
+# Modo packed: vários registros por mensagem do DB
+# =====================
+DB_PACK_HEADER = "```prisao"
+DB_MESSAGE_LIMIT = 2000
+
+
+def new_record_id() -> int:
+    """Id estável do registro: snowflake do horário atual + bits aleatórios (ordena por tempo)."""
+    return discord.utils.time_snowflake(utcnow()) | random.getrandbits(22)
+
+
+def _pack_records(lines: List[str]) -> str:
+    return DB_PACK_HEADER + "\n" + "\n".join(lines) + "\n```"
+
+
+def _packed_len(lines: List[str]) -> int:
+    return len(DB_PACK_HEADER) + 5 + sum(len(x) + 1 for x in lines)
+
+
+# maior snowflake possível: mede o registro antes de saber o id da mensagem de registro
+_MAX_SNOWFLAKE = (1 << 63) - 1
+
+
+def _fits_db_message(record: dict) -> bool:
+    """O registro, já codificado (com escapes JSON), cabe sozinho numa mensagem do DB?"""
+    return _packed_len([encode_record(record)]) <= DB_MESSAGE_LIMIT
+
+
+def _unpack_records(content: str, db_msg_id: int) -> List[dict]:
+    """Todos os registros de uma mensagem do DB, no formato antigo (um ```json) ou packed."""
+    content = (content or "").strip()
+    if content.startswith(DB_PACK_HEADER):
+        body = content[len(DB_PACK_HEADER):]
+        if body.endswith("```"):
+            body = body[:-3]
+        out: List[dict] = []
+        for line in body.splitlines():
+            rec = decode_record(line)
+            if rec is not None:
+                out.append(rec)
+        return out
+    rec = _unpack_record(content)
+    if rec is None:
+        return []
+    rec["id"] = record_id(rec, db_msg_id)
+    return [rec]
+
+
+class DbBatchWriter:
+    """Group commit dos registros no canal de DB.
+
+    Registros que chegam dentro da janela `delay` dividem uma única mensagem
+    (até o limite de 2000 caracteres). Cada `append` espera a mensagem do seu
+    lote ser enviada e recebe o id dela, então quem chamou só segue com o
+    registro já gravado no Discord.
+    """
+
+    def __init__(self):
+        self._channel: Optional[discord.TextChannel] = None
+        self._lines: List[str] = []
+        self._futures: List[asyncio.Future] = []
+        self._timer: Optional[asyncio.Task] = None
+        self._tasks = TaskSet("DbBatchWriter")
+
+    async def append(self, db_ch: discord.TextChannel, line: str, delay: float) -> int:
+        if _packed_len([line]) > DB_MESSAGE_LIMIT:
+            raise ValueError("registro maior que o limite de uma mensagem do DB")
+        if self._lines and (self._channel is None or self._channel.id != db_ch.id or _packed_len(self._lines + [line]) > DB_MESSAGE_LIMIT):
+            self.flush()
+
+        fut = asyncio.get_running_loop().create_future()
+        self._channel = db_ch
+        self._lines.append(line)
+        self._futures.append(fut)
+        if self._timer is None:
+            self._timer = self._tasks.spawn(self._flush_later(delay))
+        return await fut
+
+    def flush(self) -> None:
+        """Dispara o envio do lote pendente (sem esperar)."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._lines:
+            return
+        ch, lines, futures = self._channel, self._lines, self._futures
+        self._lines, self._futures = [], []
+        self._tasks.spawn(self._send(ch, lines, futures))
+
+    async def _flush_later(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        self._timer = None
+        self.flush()
+
+    @staticmethod
+    async def _send(ch: discord.TextChannel, lines: List[str], futures: List[asyncio.Future]) -> None:
+        try:
+            msg = await ch.send(_pack_records(lines))
+        except Exception as e:
+            for f in futures:
+                if not f.done():
+                    f.set_exception(e)
+            return
+        for f in futures:
+            if not f.done():
+                f.set_result(msg.id)
+
+
+# =====================
+# Checkpoints de agregados no canal de DB
+# =====================
+CHECKPOINT_MARKER = "#checkpoint-prisao"
+CHECKPOINT_FILENAME = "prisao-checkpoint.json.gz"
+
+
+def _is_checkpoint(msg: discord.Message, bot_id: int) -> bool:
+    return bool(msg.attachments) and msg.author.id == bot_id and (msg.content or "").startswith(CHECKPOINT_MARKER)
+
+
+async def _read_checkpoint(msg: discord.Message) -> Optional[dict]:
     try:
-        return json.loads(content)
+        data = json.loads(gzip.decompress(await msg.attachments[0].read()))
+        int(data["last_msg_id"])
+        return data
     except Exception:
         return None
 
 
-async def fetch_all_prison_records(db_channel: discord.TextChannel, limit: int = 2000) -> List[dict]:
-    records: List[dict] = []
-    async for msg in db_channel.history(limit=limit, oldest_first=True):
-        rec = _unpack_record(msg.content)
-        if rec and rec.get("type") == "prisao":
-            rec["_db_msg_id"] = msg.id
-            records.append(rec)
-    return records
+# quantas mensagens do DB são gravadas no espelho por transação durante a sync
+MIRROR_SYNC_BATCH = 500
 
+# Margem do início da janela de snowflakes: a mensagem do DB é criada depois do `ts`
+# do registro, então antes do início só há clock skew.
+WINDOW_SLACK_BEFORE = timedelta(minutes=5)
 
-async def delete_record_message(db_channel: discord.TextChannel, msg_id: int) -> None:
-    try:
-        msg = await db_channel.fetch_message(msg_id)
-        await msg.delete()
-    except Exception:
-        pass
+# Replicação do diário local: espera entre passadas que falharam (dobra até o máximo)
+JOURNAL_RETRY_MIN_SECONDS = 5.0
+JOURNAL_RETRY_MAX_SECONDS = 300.0
+# mensagens olhadas ao procurar um envio que saiu sem ser anotado no diário
+JOURNAL_SCAN_LIMIT = 200
+
+
+async def fetch_prison_records_between(db_channel: discord.TextChannel, ini: datetime, end: datetime) -> List[dict]:
+    """Registros com ini <= ts < end lendo o canal a partir do início do período.
+
+    Message ids são snowflakes (o horário de criação está nos bits altos), então o
+    início vira `after=` e o Discord pula o histórico anterior. O fim não corta:
+    a gravação no DB pode atrasar (diário local) e revogações chegam a qualquer
+    momento depois, então a leitura vai até a mensagem mais recente.
+    """
+    after = discord.Object(id=discord.utils.time_snowflake(ini - WINDOW_SLACK_BEFORE, high=False))
+    ini_ts, end_ts = ini.timestamp(), end.timestamp()
+    records: List[dict] = []
+    revoked = set()
+    async for msg in db_channel.history(limit=None, after=after, oldest_first=True):
+        for rec in _unpack_records(msg.content, msg.id):
+            if rec.get("type") == TYPE_REVOGACAO:
+                revoked.add(int(rec.get("target_id", 0) or 0))
+            elif rec.get("type") == TYPE_PRISAO and ini_ts <= record_epoch(rec) < end_ts:
+                rec["_db_msg_id"] = msg.id
+                records.append(rec)
+    return [r for r in records if record_id(r, r["_db_msg_id"]) not in revoked]
 
 
 # =====================
@@ -59,7 +215,8 @@ class PrisaoModal(discord.ui.Modal, title="Registro de Prisão"):
     preso_nome = discord.ui.TextInput(label="Nome do Preso", required=True, placeholder="Ex: João Silva")
     tempo = discord.ui.TextInput(label="Tempo de Prisão (SERVIÇOS)", required=True, placeholder="Ex: 30")
     multa = discord.ui.TextInput(label="Multa (somente números)", required=True, placeholder="Ex: 25000")
-    registro = discord.ui.TextInput(label="Registro / Ocorrência", style=discord.TextStyle.paragraph, required=True)
+    # o registro vai inteiro para o DB, que tem o limite de 2000 caracteres por mensagem
+    registro = discord.ui.TextInput(label="Registro / Ocorrência", style=discord.TextStyle.paragraph, required=True, max_length=1500)
 
     def __init__(self, cog: "PrisaoCog"):
         super().__init__(timeout=300)
@@ -98,13 +255,15 @@ class PrisaoPanelView(discord.ui.View):
 
 
 class ReprovarPrisaoModal(discord.ui.Modal, title="Reprovar Prisão"):
-    motivo = discord.ui.TextInput(label="Motivo", style=discord.TextStyle.paragraph, required=True)
+    # o motivo vai no tombstone do DB, que tem o limite de 2000 caracteres por mensagem
+    motivo = discord.ui.TextInput(label="Motivo", style=discord.TextStyle.paragraph, required=True, max_length=1000)
 
-    def __init__(self, cog: "PrisaoCog", db_msg_id: int, registro_msg_id: int):
+    def __init__(self, cog: "PrisaoCog", rec_id: int, registro_msg_id: int, db_msg_id: int = 0):
         super().__init__(timeout=240)
         self.cog = cog
-        self.db_msg_id = db_msg_id
+        self.rec_id = rec_id
         self.registro_msg_id = registro_msg_id
+        self.db_msg_id = db_msg_id
 
     async def on_submit(self, interaction: discord.Interaction):
         try:
@@ -113,30 +272,68 @@ class ReprovarPrisaoModal(discord.ui.Modal, title="Reprovar Prisão"):
             pass
         await self.cog.handle_reprovar_prisao(
             interaction,
-            db_msg_id=self.db_msg_id,
+            rec_id=self.rec_id,
             registro_msg_id=self.registro_msg_id,
+            db_msg_id=self.db_msg_id,
             motivo=str(self.motivo.value).strip(),
         )
 
 
-class PrisaoAdmView(discord.ui.View):
-    def __init__(self, cog: "PrisaoCog", db_msg_id: int, registro_msg_id: int):
-        super().__init__(timeout=None)
-        self.cog = cog
-        self.db_msg_id = db_msg_id
+# footer do embed ADM; mensagens antigas (botão sem contexto no custom_id) são lidas por ele
+_ADM_FOOTER_RE = re.compile(r"(?:Registro ID|DB Msg ID): (\d+) • Registro Msg ID: (\d+)")
+
+
+class PrisaoReprovarButton(
+    discord.ui.DynamicItem[discord.ui.Button],
+    template=r"prisao:reprovar(?::(?P<rec>[0-9]+):(?P<msg>[0-9]+)(?::(?P<db>[0-9]+))?)?",
+):
+    """Botão "Reprovar" com o registro no custom_id: funciona após restart sem View em memória.
+
+    O id da mensagem do DB vai junto para achar o registro mesmo fora do espelho
+    (botões antigos não têm; aí o registro é procurado pelo espelho).
+    """
+
+    def __init__(self, rec_id: int, registro_msg_id: int, db_msg_id: int = 0):
+        custom_id = f"prisao:reprovar:{rec_id}:{registro_msg_id}"
+        if db_msg_id:
+            custom_id += f":{db_msg_id}"
+        super().__init__(
+            discord.ui.Button(
+                label="Reprovar Prisão",
+                style=discord.ButtonStyle.danger,
+                emoji="⛔",
+                custom_id=custom_id,
+            )
+        )
+        self.rec_id = rec_id
         self.registro_msg_id = registro_msg_id
+        self.db_msg_id = db_msg_id
 
-    @discord.ui.button(
-        label="Reprovar Prisão",
-        style=discord.ButtonStyle.danger,
-        emoji="⛔",
-        custom_id="prisao:reprovar",
-    )
-    async def reprovar(self, interaction: discord.Interaction, button: discord.ui.Button):
-        cfg = load_config()
-        if not is_admin_member(interaction.user, cfg["prison"]["admin_role_ids"]):
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match: re.Match[str]):
+        if match["rec"] is not None:
+            return cls(int(match["rec"]), int(match["msg"]), int(match["db"] or 0))
+        footer = ""
+        if interaction.message and interaction.message.embeds:
+            footer = interaction.message.embeds[0].footer.text or ""
+        m = _ADM_FOOTER_RE.search(footer)
+        if not m:
+            raise ValueError("mensagem de prisão sem Registro ID no footer")
+        return cls(int(m.group(1)), int(m.group(2)))
+
+    async def callback(self, interaction: discord.Interaction):
+        cog = interaction.client.get_cog("PrisaoCog")
+        if cog is None:
+            return
+        if not is_admin_member(interaction.user, get_int_list("prison", "admin_role_ids")):
             return await interaction.response.send_message("Apenas ADM.", ephemeral=True)
-        await interaction.response.send_modal(ReprovarPrisaoModal(self.cog, self.db_msg_id, self.registro_msg_id))
+        await interaction.response.send_modal(ReprovarPrisaoModal(cog, self.rec_id, self.registro_msg_id, self.db_msg_id))
+
+
+class PrisaoAdmView(discord.ui.View):
+    def __init__(self, rec_id: int, registro_msg_id: int, db_msg_id: int = 0):
+        super().__init__(timeout=None)
+        self.add_item(PrisaoReprovarButton(rec_id, registro_msg_id, db_msg_id))
 
 
 class PrisaoRankView(discord.ui.View):
@@ -151,14 +348,14 @@ class PrisaoRankView(discord.ui.View):
         custom_id="prisao:rank_refresh",
     )
     async def refresh(self, interaction: discord.Interaction, button: discord.ui.Button):
-        cfg = load_config()
-        if not is_admin_member(interaction.user, cfg["prison"]["admin_role_ids"]):
+        if not is_admin_member(interaction.user, get_int_list("prison", "admin_role_ids")):
             return await interaction.response.send_message("Apenas ADM.", ephemeral=True)
         try:
             await interaction.response.defer(ephemeral=True)
         except Exception:
             pass
-        await self.cog._rank_loop_body()
+        # clique manual: traz o DB para o espelho e a edição passa na frente da fila
+        await self.cog._rank_loop_body(manual=True)
         await interaction.followup.send("✅ Ranking atualizado.", ephemeral=True)
 
 
@@ -168,6 +365,22 @@ class PrisaoRankView(discord.ui.View):
 class PrisaoCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self.mirror = PrisonMirror()
+        self._sync_lock = asyncio.Lock()
+        self._mirror_synced = False
+        self.db_writer = DbBatchWriter()
+        self.counters = RankCounters()
+        self._counters_ready = False
+        # mudanças no espelho durante uma reconstrução: (version, changes)
+        self._rebuild_lock = asyncio.Lock()
+        self._rebuild_log: Optional[List[tuple]] = None
+        self._last_ckpt_msg = 0
+        self._last_ckpt_at = 0.0
+        self._backfill_task: Optional[asyncio.Task] = None
+        self.journal = SubmissionJournal()
+        self._replicating: Dict[int, asyncio.Task] = {}
+        self._tasks = TaskSet("PrisaoCog")
+        self._tasks.spawn(self._resume_journal())
         self.rank_loop.start()
 
     def cog_unload(self):
@@ -175,6 +388,201 @@ class PrisaoCog(commands.Cog):
             self.rank_loop.cancel()
         except Exception:
             pass
+        self._tasks.cancel_all()
+        self.db_writer.flush()
+        self.mirror.close()
+        self.journal.close()
+
+    # ----------
+    # Espelho local do DB
+    # ----------
+    async def sync_mirror(self, db_ch: discord.TextChannel) -> None:
+        """Traz para o espelho só as mensagens do DB posteriores à última já vista."""
+        async with self._sync_lock:
+            if self.mirror.channel_id != db_ch.id or (not self._mirror_synced and self.mirror.backfill_before):
+                # canal trocado, ou espelho que ficou incompleto numa execução anterior
+                self.mirror.reset(db_ch.id)
+
+            last_id = self.mirror.last_msg_id
+            if not last_id:
+                await self._cold_start(db_ch)
+                self._mirror_synced = True
+                self._ensure_backfill(db_ch)
+                return
+
+            after = discord.Object(id=last_id)
+            batch = []
+            async for msg in db_ch.history(limit=None, after=after, oldest_first=True):
+                last_id = msg.id
+                for rec in _unpack_records(msg.content, msg.id):
+                    if rec.get("type") in MIRROR_TYPES:
+                        batch.append((msg.id, rec))
+                if len(batch) >= MIRROR_SYNC_BATCH:
+                    self._mirror_add(batch, last_id)
+                    batch = []
+            self._mirror_add(batch, last_id)
+            self._mirror_synced = True
+            self._ensure_backfill(db_ch)
+
+    async def _cold_start(self, db_ch: discord.TextChannel) -> None:
+        """Espelho vazio: lê do mais novo para o mais antigo até o checkpoint mais recente.
+
+        Com checkpoint, o ranking fica certo só com o que veio depois dele e o resto
+        do histórico entra no espelho em background. Sem checkpoint, lê tudo.
+        """
+        bot_id = self.bot.user.id if self.bot.user else 0
+        newest = 0
+        stop = 0
+        ckpt: Optional[dict] = None
+        hits: List[tuple] = []
+        batch: List[tuple] = []
+        async for msg in db_ch.history(limit=None):
+            if stop and msg.id <= stop:
+                break
+            newest = newest or msg.id
+            if ckpt is None and _is_checkpoint(msg, bot_id):
+                ckpt = await _read_checkpoint(msg)
+                if ckpt is not None:
+                    stop = int(ckpt["last_msg_id"])
+                continue
+            for rec in _unpack_records(msg.content, msg.id):
+                if rec.get("type") == TYPE_PRISAO:
+                    batch.append((msg.id, rec))
+                    hits.append((record_epoch(rec), int(rec.get("officer_id", 0) or 0), 1))
+                elif rec.get("type") == TYPE_REVOGACAO:
+                    # revogação depois do checkpoint: desconta o registro, seja ele
+                    # anterior (já contado no checkpoint) ou posterior (contado acima)
+                    batch.append((msg.id, rec))
+                    hits.append((float(epoch_of(rec.get("target_ts"))), int(rec.get("officer_id", 0) or 0), -1))
+            if len(batch) >= MIRROR_SYNC_BATCH:
+                self.mirror.apply(batch)
+                batch = []
+        # o cursor só avança no final: cold start interrompido recomeça do zero
+        self.mirror.apply(batch, newest)
+
+        if ckpt is None:
+            return
+        self.counters.load(ckpt.get("counters", {}))
+        self._apply_changes(hits)
+        self._counters_ready = True
+        self._last_ckpt_msg = stop
+        self._last_ckpt_at = utcnow().timestamp()
+        if stop:
+            self.mirror.set_backfill_before(stop + 1)
+
+    def _ensure_backfill(self, db_ch: discord.TextChannel) -> None:
+        if self.mirror.backfill_before and (self._backfill_task is None or self._backfill_task.done()):
+            self._backfill_task = self._tasks.spawn(self._backfill_mirror(db_ch))
+
+    async def _backfill_mirror(self, db_ch: discord.TextChannel) -> None:
+        """Completa o espelho com o histórico anterior ao checkpoint (não mexe no ranking)."""
+        before = self.mirror.backfill_before
+        batch: List[tuple] = []
+        async for msg in db_ch.history(limit=None, before=discord.Object(id=before)):
+            before = msg.id
+            for rec in _unpack_records(msg.content, msg.id):
+                if rec.get("type") in MIRROR_TYPES:
+                    batch.append((msg.id, rec))
+            if len(batch) >= MIRROR_SYNC_BATCH:
+                self.mirror.apply(batch)
+                self.mirror.set_backfill_before(before)
+                batch = []
+        self.mirror.apply(batch)
+        self.mirror.set_backfill_before(0)
+
+    async def _maybe_checkpoint(self, db_ch: discord.TextChannel) -> None:
+        """Grava no DB os agregados do ranking e o último message id que eles cobrem."""
+        every = get_int("prison", "checkpoint_every_minutes", 60)
+        if every <= 0 or not self._counters_ready:
+            return
+        now = utcnow().timestamp()
+        last = self.mirror.last_msg_id
+        if not last or last <= self._last_ckpt_msg or now - self._last_ckpt_at < every * 60:
+            return
+
+        # os contadores podem já incluir registros gravados depois do cursor (submit direto);
+        # o checkpoint precisa refletir exatamente o que vem até `last`
+        snap = self.counters.copy()
+        undo = [(ts, officer_id, -delta) for ts, officer_id, delta in self.mirror.changes_after_msg(last)]
+        self._apply_changes(undo, snap)
+        payload = {"v": 1, "last_msg_id": last, "ts": int(now), "counters": snap.dump()}
+        data = gzip.compress(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+        try:
+            await db_ch.send(
+                content=f"{CHECKPOINT_MARKER} last={last}",
+                file=discord.File(io.BytesIO(data), filename=CHECKPOINT_FILENAME),
+            )
+        except Exception:
+            return
+        self._last_ckpt_msg = last
+        self._last_ckpt_at = now
+
+    def _mirror_usable(self) -> bool:
+        # Espelho vazio, sendo montado pela primeira vez (cold start) ou ainda sem o
+        # histórico antigo: não vale esperar por ele só para um relatório.
+        if self.mirror.backfill_before:
+            return False
+        if self._mirror_synced:
+            return True
+        return bool(self.mirror.last_msg_id) and not self._sync_lock.locked()
+
+    def _apply_changes(self, changes: List[tuple], counters: Optional[RankCounters] = None) -> None:
+        """Aplica (ts, officer_id, delta) nos contadores; somas antes das subtrações,
+        porque um contador que chega a zero é descartado."""
+        counters = counters or self.counters
+        for ts, officer_id, delta in sorted(changes, key=lambda c: -c[2]):
+            counters.add(ts, officer_id, delta=delta)
+
+    def _mirror_add(self, rows: List[tuple], last_id: int = 0) -> None:
+        # só o que é realmente novo no espelho mexe nos contadores (revogação = -1)
+        self._track_changes(self.mirror.apply(rows, last_id))
+
+    def _mirror_remove(self, msg_ids=()) -> None:
+        self._track_changes(self.mirror.remove_messages(msg_ids))
+
+    def _track_changes(self, changes: List[tuple]) -> None:
+        if self._rebuild_log is not None:
+            self._rebuild_log.append((self.mirror.version, changes))
+        if self._counters_ready:
+            self._apply_changes(changes)
+
+    async def rebuild_counters(self) -> None:
+        """Reconstrução completa do ranking a partir do espelho (startup).
+
+        SELECT e NumPy rodam fora do event loop; o que entrar no espelho enquanto
+        isso e não estiver na leitura é reaplicado por cima do resultado.
+        """
+        async with self._rebuild_lock:
+            now = utcnow()
+            self._rebuild_log = []
+            try:
+                version, counts = await asyncio.to_thread(self._count_buckets, now)
+            finally:
+                pending, self._rebuild_log = self._rebuild_log, None
+            self.counters.replace(counts, now)
+            self._apply_changes([c for v, changes in pending if v > version for c in changes])
+            self._counters_ready = True
+
+    def _count_buckets(self, now: datetime) -> tuple:
+        starts = RankCounters()
+        starts.roll(now)
+        version, rows = self.mirror.columns_between(start_of_year(now))
+        return version, bucket_counts(RecordArrays.from_rows(rows), starts.starts)
+
+    def _is_db_channel(self, channel_id: int) -> bool:
+        # o espelho guarda o id do canal que ele acompanha; evita abrir o config a cada delete
+        return bool(channel_id) and self.mirror.channel_id == int(channel_id)
+
+    @commands.Cog.listener("on_raw_message_delete")
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
+        # alguém apagou um registro direto no canal de DB
+        if self._is_db_channel(payload.channel_id):
+            self._mirror_remove(msg_ids=[payload.message_id])
+
+    @commands.Cog.listener("on_raw_bulk_message_delete")
+    async def on_raw_bulk_message_delete(self, payload: discord.RawBulkMessageDeleteEvent):
+        if self._is_db_channel(payload.channel_id):
+            self._mirror_remove(msg_ids=payload.message_ids)
 
     # ----------
     # Setup painel
@@ -183,7 +591,7 @@ class PrisaoCog(commands.Cog):
     async def setup_prisao(self, interaction: discord.Interaction):
         cfg = load_config()
         ch_id = cfg["prison"]["channel_realizar_prisao_id"]
-        ch = await interaction.guild.fetch_channel(ch_id)
+        ch = await self.bot.channel_registry.resolve(interaction.guild, ch_id)
         if not isinstance(ch, discord.TextChannel):
             return await interaction.response.send_message("Canal de painel de prisão inválido no config.json.", ephemeral=True)
 
@@ -203,7 +611,7 @@ class PrisaoCog(commands.Cog):
 
         view = PrisaoPanelView(self)
 
-        panel_msg_id = int(cfg["prison"].get("panel_message_id", 0) or 0)
+        panel_msg_id = get_int("prison", "panel_message_id")
         msg = None
         if panel_msg_id:
             try:
@@ -235,121 +643,345 @@ class PrisaoCog(commands.Cog):
             return await interaction.followup.send("❌ Multa deve ser apenas números.", ephemeral=True)
 
         guild = interaction.guild
-        reg_ch = await guild.fetch_channel(cfg["prison"]["channel_registro_prisoes_id"])
-        adm_ch = await guild.fetch_channel(cfg["prison"]["channel_prisao_adm_id"])
-        db_ch = await guild.fetch_channel(cfg["prison"]["channel_db_prisao_id"])
-
-        if not isinstance(reg_ch, discord.TextChannel) or not isinstance(adm_ch, discord.TextChannel) or not isinstance(db_ch, discord.TextChannel):
+        try:
+            channels = await asyncio.gather(
+                self.bot.channel_registry.resolve(guild, cfg["prison"]["channel_registro_prisoes_id"]),
+                self.bot.channel_registry.resolve(guild, cfg["prison"]["channel_prisao_adm_id"]),
+                self.bot.channel_registry.resolve(guild, cfg["prison"]["channel_db_prisao_id"]),
+            )
+        except Exception:
+            channels = None  # API fora do ar: o replicador resolve depois
+        if channels is not None and not all(isinstance(c, discord.TextChannel) for c in channels):
             return await interaction.followup.send("❌ Configuração de canais de prisão inválida.", ephemeral=True)
 
-        embed = discord.Embed(title="📄 Prisão Registrada", color=discord.Color.orange(), timestamp=utcnow())
-        embed.add_field(name="Preso", value=f"**{data['preso_nome']}** (ID `{data['preso_id']}`)", inline=False)
-        embed.add_field(name="Tempo", value=f"`{data['tempo']}` serviços", inline=True)
-        embed.add_field(name="Multa", value=f"`{data['multa']}`", inline=True)
-        embed.add_field(name="Registro", value=data["registro"][:1000], inline=False)
-        embed.set_footer(text=f"Registrado por {interaction.user} • ID {interaction.user.id}")
-
-        registro_msg = await reg_ch.send(embed=embed)
-
         record = {
+            "id": new_record_id(),
             "type": "prisao",
-            "ts": utcnow().isoformat(),
+            "ts": int(utcnow().timestamp()),
             "officer_id": interaction.user.id,
-            "officer_tag": str(interaction.user),
             "preso_id": data["preso_id"],
             "preso_nome": data["preso_nome"],
             "tempo": int(data["tempo"]),
             "multa": int(data["multa"]),
             "registro": data["registro"],
-            "registro_channel_id": reg_ch.id,
-            "registro_message_id": registro_msg.id,
+            "registro_message_id": 0,
         }
-        db_msg = await db_ch.send(_pack_record(record))
+        # aspas, barras e quebras de linha crescem ao serem escapadas: o limite do
+        # campo não garante que a linha caiba no DB, então mede a linha de verdade
+        if not _fits_db_message(dict(record, registro_message_id=_MAX_SNOWFLAKE)):
+            return await interaction.followup.send(
+                "❌ O texto do registro ficou grande demais para o DB. Encurte o campo **Registro** e tente de novo.",
+                ephemeral=True,
+            )
+
+        # Primeiro o diário local (fsync): daqui em diante o registro não se perde,
+        # mesmo que a API do Discord caia. A publicação nos canais fica com o replicador.
+        try:
+            await asyncio.to_thread(self.journal.submit, record["id"], {"record": record, "officer_tag": str(interaction.user)})
+        except Exception:
+            return await interaction.followup.send("❌ Falha ao gravar o registro. Tente novamente.", ephemeral=True)
+        self._start_replication(record["id"])
+
+        await interaction.followup.send(
+            "✅ Prisão registrada. A publicação nos canais segue em segundo plano; você recebe a confirmação por DM.",
+            ephemeral=True,
+        )
+
+    # ----------
+    # Replicação do diário -> Discord
+    # ----------
+    @staticmethod
+    def _registro_embed(record: dict, officer_tag: str) -> discord.Embed:
+        ts = datetime.fromtimestamp(epoch_of(record.get("ts")) or utcnow().timestamp(), tz=timezone.utc)
+        embed = discord.Embed(title="📄 Prisão Registrada", color=discord.Color.orange(), timestamp=ts)
+        embed.add_field(name="Preso", value=f"**{record['preso_nome']}** (ID `{record['preso_id']}`)", inline=False)
+        embed.add_field(name="Tempo", value=f"`{record['tempo']}` serviços", inline=True)
+        embed.add_field(name="Multa", value=f"`{record['multa']}`", inline=True)
+        embed.add_field(name="Registro", value=str(record["registro"])[:1000], inline=False)
+        # o Registro ID no rodapé permite achar a mensagem se o envio saiu sem ser anotado
+        embed.set_footer(text=f"Registrado por {officer_tag} • ID {record['officer_id']} • Registro ID: {record['id']}")
+        return embed
 
-        adm_embed = embed.copy()
-        adm_embed.title = "🛡️ Prisão para Revisão (ADM)"
-        adm_embed.color = discord.Color.red()
-        adm_embed.add_field(name="Ação", value="Use **⛔ Reprovar Prisão** se houver erro/abuso.", inline=False)
-        adm_embed.set_footer(text=f"DB Msg ID: {db_msg.id} • Registro Msg ID: {registro_msg.id}")
+    def _start_replication(self, rec_id: int, recovered: bool = False) -> None:
+        task = self._replicating.get(rec_id)
+        if task is None or task.done():
+            self._replicating[rec_id] = self._tasks.spawn(self._replicate(rec_id, recovered))
 
-        await adm_ch.send(embed=adm_embed, view=PrisaoAdmView(self, db_msg.id, registro_msg.id))
+    async def _resume_journal(self) -> None:
+        """Startup: retoma o que ficou pendente no diário (etapas já anotadas são puladas)."""
+        await self.bot.wait_until_ready()
+        for entry in self.journal.pending():
+            self._start_replication(entry["id"], recovered=True)
 
+    async def _replicate(self, rec_id: int, recovered: bool) -> None:
+        delay = JOURNAL_RETRY_MIN_SECONDS
         try:
-            await interaction.user.send(embed=embed)
+            while True:
+                try:
+                    if await self._replicate_once(rec_id, recovered):
+                        return
+                except asyncio.CancelledError:
+                    raise
+                except ValueError as e:
+                    # não cabe no DB: repetir não adianta
+                    await self._abandon_replication(rec_id, str(e))
+                    return
+                except Exception as e:
+                    log.warning("Replicação do registro %s falhou (nova tentativa em %.0fs): %s", rec_id, delay, e)
+                # depois de uma falha, qualquer envio pode ter saído sem ser anotado
+                recovered = True
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, JOURNAL_RETRY_MAX_SECONDS)
+        finally:
+            self._replicating.pop(rec_id, None)
+
+    async def _abandon_replication(self, rec_id: int, reason: str) -> None:
+        """Erro permanente: desfaz o registro público, avisa o policial e tira a entrada do diário."""
+        log.error("Registro %s descartado do diário: %s", rec_id, reason)
+        entry = self.journal.get(rec_id)
+        if entry is None:
+            return
+        record = entry["data"].get("record", {})
+        reg_msg_id = int(entry["steps"].get("registro") or 0)
+        cfg = load_config()
+        guild = self.bot.get_guild(cfg["guild_id"])
+        if reg_msg_id and guild is not None:
+            try:
+                reg_ch = await self.bot.channel_registry.resolve(guild, cfg["prison"]["channel_registro_prisoes_id"])
+                await reg_ch.get_partial_message(reg_msg_id).delete()
+            except Exception:
+                pass
+        try:
+            officer = self.bot.get_user(int(record["officer_id"])) or await self.bot.fetch_user(int(record["officer_id"]))
+            await officer.send(
+                f"❌ A prisão de **{record.get('preso_nome', '—')}** não pôde ser gravada no DB ({reason}). "
+                "Registre de novo com um texto menor."
+            )
         except Exception:
             pass
+        await asyncio.to_thread(self.journal.done, rec_id)
+
+    async def _find_marked(self, channel: discord.TextChannel, rec_id: int, ts: float) -> Optional[discord.Message]:
+        """Mensagem do bot com "Registro ID: <rec_id>" no rodapé, enviada perto de `ts`."""
+        marker = re.compile(rf"Registro ID: {rec_id}\b")
+        after = discord.Object(id=discord.utils.time_snowflake(datetime.fromtimestamp(ts - 60, tz=timezone.utc)))
+        me = self.bot.user.id if self.bot.user else 0
+        async for msg in channel.history(limit=JOURNAL_SCAN_LIMIT, after=after, oldest_first=True):
+            if msg.author.id != me:
+                continue
+            for e in msg.embeds:
+                if e.footer and e.footer.text and marker.search(e.footer.text):
+                    return msg
+        return None
 
-        await interaction.followup.send("✅ Prisão registrada com sucesso.", ephemeral=True)
+    async def _replicate_once(self, rec_id: int, recovered: bool) -> bool:
+        """Uma passada pelo grafo registro -> DB -> {revisão ADM, DM}; True quando concluído.
+
+        Cada etapa concluída vai para o diário. Com `recovered`, antes de reenviar
+        procura o que possa ter saído sem ser anotado (rodapé/espelho do DB).
+        """
+        entry = self.journal.get(rec_id)
+        if entry is None:
+            return True
+        cfg = load_config()
+        guild = self.bot.get_guild(cfg["guild_id"])
+        if guild is None:
+            return False
+        reg_ch, adm_ch, db_ch = await asyncio.gather(
+            self.bot.channel_registry.resolve(guild, cfg["prison"]["channel_registro_prisoes_id"]),
+            self.bot.channel_registry.resolve(guild, cfg["prison"]["channel_prisao_adm_id"]),
+            self.bot.channel_registry.resolve(guild, cfg["prison"]["channel_db_prisao_id"]),
+        )
+        if not isinstance(reg_ch, discord.TextChannel) or not isinstance(adm_ch, discord.TextChannel) or not isinstance(db_ch, discord.TextChannel):
+            return False
+
+        record = entry["data"]["record"]
+        steps = entry["steps"]
+        ts = epoch_of(record.get("ts"))
+        embed = self._registro_embed(record, entry["data"].get("officer_tag", ""))
+
+        # 1) registro público
+        reg_msg_id = int(steps.get("registro") or 0)
+        if not reg_msg_id:
+            msg = await self._find_marked(reg_ch, rec_id, ts) if recovered else None
+            if msg is None:
+                msg = await with_retries(lambda: reg_ch.send(embed=embed))
+            reg_msg_id = msg.id
+            await asyncio.to_thread(self.journal.mark, rec_id, "registro", reg_msg_id)
+        record["registro_message_id"] = reg_msg_id
+
+        # 2) DB (precisa do id do registro)
+        db_msg_id = int(steps.get("db") or 0)
+        if "db" not in steps:
+            if recovered:
+                await self.sync_mirror(db_ch)
+                existing = self.mirror.get(rec_id)
+                if existing:
+                    db_msg_id = int(existing["_db_msg_id"])
+            if not db_msg_id:
+                db_msg_id = await with_retries(lambda: self.write_record(db_ch, record))
+                self._mirror_add([(db_msg_id, record)])
+            await asyncio.to_thread(self.journal.mark, rec_id, "db", db_msg_id)
+
+        # 3) revisão ADM e DM do policial, em paralelo
+        async def send_adm():
+            if "adm" in steps:
+                return
+            msg = await self._find_marked(adm_ch, rec_id, ts) if recovered else None
+            if msg is None:
+                adm_embed = embed.copy()
+                adm_embed.title = "🛡️ Prisão para Revisão (ADM)"
+                adm_embed.color = discord.Color.red()
+                adm_embed.add_field(name="Ação", value="Use **⛔ Reprovar Prisão** se houver erro/abuso.", inline=False)
+                adm_embed.set_footer(text=f"Registro ID: {rec_id} • Registro Msg ID: {reg_msg_id}")
+                msg = await with_retries(lambda: adm_ch.send(embed=adm_embed, view=PrisaoAdmView(rec_id, reg_msg_id, db_msg_id)))
+            await asyncio.to_thread(self.journal.mark, rec_id, "adm", msg.id)
+
+        async def send_dm():
+            if "dm" in steps:
+                return
+            try:
+                officer = self.bot.get_user(int(record["officer_id"])) or await self.bot.fetch_user(int(record["officer_id"]))
+                await with_retries(lambda: officer.send(embed=embed))
+            except (discord.Forbidden, discord.NotFound):
+                pass  # DMs fechadas: não há o que repetir
+            await asyncio.to_thread(self.journal.mark, rec_id, "dm", 1)
+
+        results = await asyncio.gather(send_adm(), send_dm(), return_exceptions=True)
+        for r in results:
+            if isinstance(r, BaseException):
+                raise r
+
+        await asyncio.to_thread(self.journal.done, rec_id)
+        await asyncio.to_thread(self.journal.compact)
+        return True
+
+    async def write_record(self, db_ch: discord.TextChannel, record: dict) -> int:
+        """Grava o registro no DB e devolve o id da mensagem que o contém.
+
+        ValueError se o registro não cabe numa mensagem (erro permanente).
+        """
+        if not _fits_db_message(record):
+            raise ValueError("registro maior que o limite de uma mensagem do DB")
+        if get_bool("prison", "db_packed"):
+            delay = get_float("prison", "db_pack_flush_seconds", 2.0)
+            return await self.db_writer.append(db_ch, encode_record(record), delay)
+        msg = await db_ch.send(_pack_records([encode_record(record)]))
+        return msg.id
+
+    async def _fetch_db_record(self, db_ch: discord.TextChannel, db_msg_id: int, rec_id: int) -> Optional[dict]:
+        """Lê um registro direto da mensagem do DB (quando o espelho ainda não o tem)."""
+        try:
+            db_msg = await db_ch.fetch_message(db_msg_id)
+        except Exception:
+            return None
+        return next(
+            (r for r in _unpack_records(db_msg.content, db_msg.id)
+             if r.get("type") == TYPE_PRISAO and record_id(r, db_msg.id) == rec_id),
+            None,
+        )
 
     # ----------
     # Revogar/Reprovar prisão (ADM)
     # ----------
-    async def handle_reprovar_prisao(self, interaction: discord.Interaction, db_msg_id: int, registro_msg_id: int, motivo: str):
+    async def _resolve_record(self, db_ch: discord.TextChannel, rec_id: int, db_msg_id: int) -> Optional[dict]:
+        """Registro a revogar: espelho, mensagem do DB do botão, espelho em dia e, por
+        último, o formato antigo (id do registro = id da mensagem do DB)."""
+        record = self.mirror.get(rec_id)
+        if record is None and db_msg_id:
+            record = await self._fetch_db_record(db_ch, db_msg_id, rec_id)
+        if record is None:
+            try:
+                await self.sync_mirror(db_ch)
+            except Exception:
+                pass
+            record = self.mirror.get(rec_id)
+        if record is None:
+            record = await self._fetch_db_record(db_ch, rec_id, rec_id)
+        if record is not None and "_revoked" not in record:
+            record["_revoked"] = self.mirror.is_revoked(rec_id)
+        return record
+
+    async def handle_reprovar_prisao(self, interaction: discord.Interaction, rec_id: int, registro_msg_id: int, motivo: str, db_msg_id: int = 0):
         cfg = load_config()
         guild = interaction.guild
 
-        reg_ch = await guild.fetch_channel(cfg["prison"]["channel_registro_prisoes_id"])
-        db_ch = await guild.fetch_channel(cfg["prison"]["channel_db_prisao_id"])
+        reg_ch = await self.bot.channel_registry.resolve(guild, cfg["prison"]["channel_registro_prisoes_id"])
+        db_ch = await self.bot.channel_registry.resolve(guild, cfg["prison"]["channel_db_prisao_id"])
 
         if not isinstance(reg_ch, discord.TextChannel) or not isinstance(db_ch, discord.TextChannel):
             return await interaction.followup.send("❌ Configuração de canais inválida.", ephemeral=True)
 
-        # 1) Puxa o registro do DB antes de apagar
-        record = None
+        # 1) Registro original. Sem ele não há tombstone: nada é apagado nem anunciado.
+        record = await self._resolve_record(db_ch, rec_id, db_msg_id)
+        if record is None:
+            return await interaction.followup.send(
+                "❌ Registro não encontrado no DB (o espelho pode estar sendo montado). Nada foi alterado; tente de novo em alguns minutos.",
+                ephemeral=True,
+            )
+        if record.get("_revoked"):
+            return await interaction.followup.send("ℹ️ Essa prisão já foi revogada.", ephemeral=True)
+
+        # 2) DB: só cresce. A revogação é um tombstone anexado que aponta para o
+        #    registro; espelho, ranking e relatórios aplicam na ordem do canal.
+        #    Vem antes de qualquer outra coisa: se falhar, nada muda.
+        tombstone = {
+            "type": TYPE_REVOGACAO,
+            "id": new_record_id(),
+            "ts": int(utcnow().timestamp()),
+            "target_id": rec_id,
+            "target_ts": epoch_of(record.get("ts")),
+            "officer_id": int(record.get("officer_id", 0) or 0),
+            "admin_id": interaction.user.id,
+            "motivo": motivo,
+        }
+        if not _fits_db_message(tombstone):
+            return await interaction.followup.send("❌ Motivo grande demais para o DB. Encurte e tente de novo.", ephemeral=True)
         try:
-            db_msg = await db_ch.fetch_message(db_msg_id)
-            record = _unpack_record(db_msg.content)
+            tomb_msg_id = await with_retries(lambda: self.write_record(db_ch, tombstone))
         except Exception:
-            record = None
+            return await interaction.followup.send("❌ Falha ao gravar a revogação no DB. Tente novamente.", ephemeral=True)
+        self._mirror_add([(tomb_msg_id, tombstone)])
 
-        # 2) Remove do registro público (mensagem original)
+        # 3) Remove do registro público (mensagem original)
         try:
             msg = await reg_ch.fetch_message(registro_msg_id)
             await msg.delete()
         except Exception:
             pass
 
-        # 3) Remove do DB
-        await delete_record_message(db_ch, db_msg_id)
-
         # 4) Publica aviso completo no canal de registro + DM no policial
-        if record:
-            preso_nome = record.get("preso_nome", "—")
-            preso_id = record.get("preso_id", "—")
-            tempo = record.get("tempo", "—")
-            multa = record.get("multa", "—")
-            registro_txt = str(record.get("registro", "—"))
-            officer_id = int(record.get("officer_id", 0) or 0)
-            ts_iso = str(record.get("ts", ""))
-            try:
-                ts = parse_iso(ts_iso)
-            except Exception:
-                ts = utcnow()
+        preso_nome = record.get("preso_nome", "—")
+        preso_id = record.get("preso_id", "—")
+        tempo = record.get("tempo", "—")
+        multa = record.get("multa", "—")
+        registro_txt = str(record.get("registro", "—"))
+        officer_id = int(record.get("officer_id", 0) or 0)
+        ts_epoch = epoch_of(record.get("ts"))
+        ts = datetime.fromtimestamp(ts_epoch, tz=timezone.utc) if ts_epoch else utcnow()
 
-            embed = discord.Embed(
-                title="⚠️ Prisão revogada",
-                description=f"**Motivo:** {motivo}\n**Revogado por:** {interaction.user.mention}",
-                color=discord.Color.red(),
-                timestamp=ts,
-            )
-            embed.add_field(name="Preso", value=f"**{preso_nome}** (ID `{preso_id}`)", inline=False)
-            embed.add_field(name="Tempo", value=f"`{tempo}` serviços", inline=True)
-            embed.add_field(name="Multa", value=f"`{multa}`", inline=True)
-            embed.add_field(name="Registro", value=registro_txt[:1000], inline=False)
-            embed.set_footer(text=f"DB Msg ID: {db_msg_id}")
+        embed = discord.Embed(
+            title="⚠️ Prisão revogada",
+            description=f"**Motivo:** {motivo}\n**Revogado por:** {interaction.user.mention}",
+            color=discord.Color.red(),
+            timestamp=ts,
+        )
+        embed.add_field(name="Preso", value=f"**{preso_nome}** (ID `{preso_id}`)", inline=False)
+        embed.add_field(name="Tempo", value=f"`{tempo}` serviços", inline=True)
+        embed.add_field(name="Multa", value=f"`{multa}`", inline=True)
+        embed.add_field(name="Registro", value=registro_txt[:1000], inline=False)
+        embed.set_footer(text=f"Registro ID: {rec_id}")
 
-            await reg_ch.send(embed=embed)
+        await reg_ch.send(embed=embed)
 
-            if officer_id:
-                try:
-                    officer = await self.bot.fetch_user(officer_id)
-                    dm_embed = embed.copy()
-                    dm_embed.title = "⛔ Sua prisão foi revogada"
-                    await officer.send(embed=dm_embed)
-                except Exception:
-                    pass
-        else:
-            await reg_ch.send(f"⚠️ Uma prisão foi revogada por um ADM. Motivo: {motivo}")
+        if officer_id:
+            try:
+                officer = await self.bot.fetch_user(officer_id)
+                dm_embed = embed.copy()
+                dm_embed.title = "⛔ Sua prisão foi revogada"
+                await officer.send(embed=dm_embed)
+            except Exception:
+                pass
 
         await interaction.followup.send("✅ Prisão revogada e notificada.", ephemeral=True)
 
@@ -388,8 +1020,7 @@ class PrisaoCog(commands.Cog):
     @app_commands.command(name="relatorio_periodo", description="Relatório de prisões por período (usa o DB).")
     @app_commands.describe(inicio="Ex: 2026-01-01 ou 01/01/2026", fim="Ex: 2026-01-19 ou 19/01/2026")
     async def relatorio_periodo(self, interaction: discord.Interaction, inicio: str, fim: str):
-        cfg = load_config()
-        if not is_admin_member(interaction.user, cfg["prison"]["admin_role_ids"]):
+        if not is_admin_member(interaction.user, get_int_list("prison", "admin_role_ids")):
             return await interaction.response.send_message("Apenas ADM.", ephemeral=True)
 
         try:
@@ -423,49 +1054,29 @@ class PrisaoCog(commands.Cog):
 
         guild = interaction.guild
         try:
-            db_ch = await guild.fetch_channel(cfg["prison"]["channel_db_prisao_id"])
+            db_ch = await self.bot.channel_registry.resolve(guild, get_int("prison", "channel_db_prisao_id"))
         except Exception:
             db_ch = None
 
         if not isinstance(db_ch, discord.TextChannel):
             return await interaction.followup.send("❌ Canal de DB de prisão inválido no config.json.", ephemeral=True)
 
-        records = await fetch_all_prison_records(db_ch, limit=4000)
-
-        filtered = []
-        for r in records:
-            try:
-                ts = parse_iso(str(r.get('ts', '')))
-                if ts.tzinfo is None:
-                    ts = ts.replace(tzinfo=timezone.utc)
-                ts = ts.astimezone(timezone.utc)
-            except Exception:
-                continue
-            if ini_dt <= ts < end_dt:
-                filtered.append(r)
+        if self._mirror_usable():
+            await self.sync_mirror(db_ch)
+            _, rows = await asyncio.to_thread(self.mirror.columns_between, ini_dt, end_dt)
+            arr = RecordArrays.from_rows(rows)
+        else:
+            arr = RecordArrays.from_records(await fetch_prison_records_between(db_ch, ini_dt, end_dt))
 
-        total = len(filtered)
+        total = len(arr)
         if total == 0:
             return await interaction.followup.send("📭 Nenhuma prisão encontrada nesse período.", ephemeral=True)
 
-        # agrega
-        by_officer: dict[int, int] = {}
-        total_tempo = 0
-        total_multa = 0
-        for r in filtered:
-            oid = int(r.get('officer_id', 0) or 0)
-            if oid:
-                by_officer[oid] = by_officer.get(oid, 0) + 1
-            try:
-                total_tempo += int(r.get('tempo', 0) or 0)
-            except Exception:
-                pass
-            try:
-                total_multa += int(r.get('multa', 0) or 0)
-            except Exception:
-                pass
-
-        top = sorted(by_officer.items(), key=lambda x: x[1], reverse=True)[:15]
+        # agrega (vetorizado: colunas int64 + np.unique)
+        summary = period_summary(arr, top_n=15)
+        total_tempo = summary["tempo"]
+        total_multa = summary["multa"]
+        top = summary["top"]
         top_lines = "\n".join([f"`{i+1:02d}.` <@{uid}> — **{cnt}**" for i, (uid, cnt) in enumerate(top)]) or "_Sem dados_"
 
         # Texto do período (mantém o que o usuário digitou, mas com datas calculadas)
@@ -499,65 +1110,40 @@ class PrisaoCog(commands.Cog):
         embed.set_footer(text="Hype Police • Ranking")
         return embed
 
-    def _calc_buckets(self, records: List[dict]) -> Dict[str, Dict[int, int]]:
-        now = utcnow()
-        day0 = start_of_day(now)
-        week0 = start_of_week(now)
-        month0 = start_of_month(now)
-        year0 = start_of_year(now)
-
-        buckets: Dict[str, Dict[int, int]] = {"day": {}, "week": {}, "month": {}, "year": {}}
-
-        for r in records:
-            try:
-                ts = parse_iso(str(r.get("ts", "")))
-            except Exception:
-                ts = now
-            officer_id = int(r.get("officer_id", 0) or 0)
-            if not officer_id:
-                continue
-
-            def inc(bucket: str):
-                buckets[bucket][officer_id] = buckets[bucket].get(officer_id, 0) + 1
-
-            if ts >= year0:
-                inc("year")
-            if ts >= month0:
-                inc("month")
-            if ts >= week0:
-                inc("week")
-            if ts >= day0:
-                inc("day")
-
-        return buckets
-
-    async def _rank_loop_body(self):
+    async def _rank_loop_body(self, manual: bool = False):
         cfg = load_config()
         guild = self.bot.get_guild(cfg["guild_id"])
         if not guild:
             return
 
         try:
-            rank_ch = await guild.fetch_channel(cfg["prison"]["channel_rank_id"])
-            db_ch = await guild.fetch_channel(cfg["prison"]["channel_db_prisao_id"])
+            rank_ch = await self.bot.channel_registry.resolve(guild, cfg["prison"]["channel_rank_id"])
+            db_ch = await self.bot.channel_registry.resolve(guild, cfg["prison"]["channel_db_prisao_id"])
         except Exception:
             return
         if not isinstance(rank_ch, discord.TextChannel) or not isinstance(db_ch, discord.TextChannel):
             return
 
-        records = await fetch_all_prison_records(db_ch, limit=2000)
-        buckets = self._calc_buckets(records)
+        await self.sync_mirror(db_ch)
+        # com backfill pendente o espelho ainda não tem o ano inteiro; os contadores
+        # vieram do checkpoint e seguem valendo
+        if not self._counters_ready and not self.mirror.backfill_before:
+            await self.rebuild_counters()
+        await self._maybe_checkpoint(db_ch)
+        buckets = self.counters.snapshot()
         embed = self._build_rank_embed(buckets)
 
-        msg_id = int(cfg["prison"].get("rank_message_id", 0) or 0)
-        msg = None
+        msg_id = get_int("prison", "rank_message_id")
         if msg_id:
-            try:
-                msg = await rank_ch.fetch_message(msg_id)
-                await msg.edit(embed=embed, view=PrisaoRankView(self))
-            except Exception:
-                msg = None
-        if msg is None:
+            # edição cosmética: vai pela fila de fundo, e edições ainda não enviadas
+            # são substituídas pela mais nova. O clique em "Atualizar agora" passa na frente.
+            self.bot.outbound.post(
+                rank_ch.id,
+                lambda: self._edit_rank_message(rank_ch, msg_id, embed),
+                priority=PRIORITY_INTERACTIVE if manual else PRIORITY_BACKGROUND,
+                key=("edit", msg_id),
+            )
+        else:
             try:
                 msg = await rank_ch.send(embed=embed, view=PrisaoRankView(self))
                 try:
@@ -569,6 +1155,16 @@ class PrisaoCog(commands.Cog):
             except Exception:
                 pass
 
+    async def _edit_rank_message(self, rank_ch: discord.TextChannel, msg_id: int, embed: discord.Embed):
+        try:
+            await rank_ch.get_partial_message(msg_id).edit(embed=embed, view=PrisaoRankView(self))
+        except discord.NotFound:
+            # mensagem apagada: a próxima volta do loop cria outra
+            cfg = load_config()
+            if int(cfg["prison"].get("rank_message_id", 0)) == msg_id:
+                cfg["prison"]["rank_message_id"] = 0
+                save_config(cfg)
+
     @tasks.loop(minutes=1)
     async def rank_loop(self):
         await self._rank_loop_body()
@@ -578,4 +1174,5 @@ async def setup(bot: commands.Bot):
     cog = PrisaoCog(bot)
     bot.add_view(PrisaoPanelView(cog))
     bot.add_view(PrisaoRankView(cog))
+    bot.add_dynamic_items(PrisaoReprovarButton)
     await bot.add_cog(cog)
@@ -1,12 +1,27 @@
 
 from __future__ import annotations
-import io
+import asyncio
+import json
+import logging
+import os
+import re
+import time
 import discord
 from discord.ext import commands, tasks
 from discord import app_commands
 from typing import Dict, Optional, List
-from utils.config import load_config, save_config
+from utils.assignment import AdminLoadBalancer
+from utils.background import TaskSet
+from utils.config import DATA_DIR, load_config, save_config, get_bool, get_float, get_int, get_int_list, write_atomic
+from utils.histogram import HistogramSet, LogHistogram
+from utils.outbound import PRIORITY_BACKGROUND
 from utils.perm import is_admin_member
+from utils.scheduler import DeadlineScheduler
+from utils.ticket_index import TicketIndex
+from utils.ticket_store import TicketStore
+from utils.transcript import PART_MARGIN_BYTES, build_archive, spool_channel, upload_limit
+
+log = logging.getLogger(__name__)
 
 # ============
 # Helpers
@@ -31,6 +46,101 @@ def _can_create_channels(me: discord.Member) -> bool:
     perms = me.guild_permissions
     return perms.manage_channels or perms.administrator
 
+# mensagem enviada por assign_ticket; usada para descobrir o ADM ao reconstruir o estado
+_ASSUMED_RE = re.compile(r"Ticket assumido por <@!?(\d+)>")
+
+# quantos canais de ticket são reconciliados ao mesmo tempo no startup
+REHYDRATE_CONCURRENCY = 5
+
+# intervalo mínimo entre o início de dois encerramentos automáticos
+AUTO_CLOSE_SPACING_SECONDS = 2.0
+
+# histogramas de SLA (tempo até atribuição / 1ª resposta / resolução), persistidos em data/
+SLA_PATH = os.path.join(DATA_DIR, "ticket_sla.json")
+SLA_METRICS = (
+    ("atribuicao", "Abertura → atribuição"),
+    ("primeira_resposta", "Atribuição → 1ª resposta do ADM"),
+    ("resolucao", "Abertura → encerramento"),
+)
+
+def _fmt_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    if seconds < 86400:
+        return f"{seconds // 3600}h{(seconds % 3600) // 60:02d}m"
+    return f"{seconds // 86400}d{(seconds % 86400) // 3600:02d}h"
+
+def _fmt_hist(h: LogHistogram) -> str:
+    return f"n={h.count} • p50 {_fmt_duration(h.quantile(0.5))} • p90 {_fmt_duration(h.quantile(0.9))} • máx {_fmt_duration(h.max)}"
+
+# canais pré-criados (ocultos) à espera de um ticket; identificados pelo tópico
+POOL_TOPIC = "ticket-pool"
+
+# Mensagem inicial dentro do ticket (fixada) conforme o tipo
+_INTRO_TEXT = {
+    "duvidas": (
+        "❓ Dúvidas",
+        "Utilize este espaço para esclarecer dúvidas relacionadas a procedimentos, regras, cursos ou funcionamento interno da Polícia."
+    ),
+    "denuncia": (
+        "🚨 Denúncia",
+        "Espaço para denunciar policiais que descumpram regras, procedimentos ou ajam de forma inadequada dentro da corporação."
+    ),
+}
+
+def _intro_embed(kind: Optional[str]) -> discord.Embed:
+    title, desc = _INTRO_TEXT.get(kind or "", ("🎫 Ticket", ""))
+    intro = discord.Embed(title=title, description=desc, color=discord.Color.dark_grey())
+    intro.set_footer(text="Aguarde um ADM assumir o atendimento.")
+    return intro
+
+# limite do Discord de canais por categoria
+CATEGORY_CHANNEL_LIMIT = 50
+
+def _ticket_categories(guild: discord.Guild) -> List[discord.CategoryChannel]:
+    """Categorias de ticket, na ordem de preenchimento (`category_ids`, ou a `category_id` antiga)."""
+    ids = get_int_list("tickets", "category_ids") or [get_int("tickets", "category_id")]
+    cats = [guild.get_channel(cid) for cid in ids]
+    return [c for c in cats if isinstance(c, discord.CategoryChannel)]
+
+def _categories_with_room(guild: discord.Guild) -> List[discord.CategoryChannel]:
+    return [c for c in _ticket_categories(guild) if len(c.channels) < CATEGORY_CHANNEL_LIMIT]
+
+# erros da API que significam "sem vaga": servidor no limite de canais (30013) ou
+# categoria cheia (50035 com "Maximum number of channels in category" em parent_id)
+_MAX_GUILD_CHANNELS = 30013
+_INVALID_FORM_BODY = 50035
+
+def _is_capacity_error(e: discord.HTTPException) -> bool:
+    if e.code == _MAX_GUILD_CHANNELS:
+        return True
+    return e.code == _INVALID_FORM_BODY and "maximum number of channels" in (e.text or "").lower()
+
+def _thread_mode() -> bool:
+    """`tickets.thread_mode`: cada ticket é uma thread privada no canal hub."""
+    return get_bool("tickets", "thread_mode")
+
+def _ticket_hub(guild: discord.Guild) -> Optional[discord.TextChannel]:
+    hub = guild.get_channel(get_int("tickets", "hub_channel_id"))
+    return hub if isinstance(hub, discord.TextChannel) else None
+
+# tipos de canal que podem ser um ticket
+TICKET_CHANNEL_TYPES = (discord.TextChannel, discord.Thread)
+
+# embed inicial do ticket/alinhamento; usado para achar o opener de uma thread no startup
+_OPENER_RE = re.compile(r"(?:Solicitante:|\*\*Alvo:\*\*) <@!?(\d+)>")
+
+def _pool_overwrites(guild: discord.Guild) -> Dict[discord.abc.Snowflake, discord.PermissionOverwrite]:
+    overwrites: Dict[discord.abc.Snowflake, discord.PermissionOverwrite] = {
+        guild.default_role: discord.PermissionOverwrite(view_channel=False),
+    }
+    if guild.me:
+        overwrites[guild.me] = discord.PermissionOverwrite(view_channel=True, send_messages=True, read_message_history=True, manage_channels=True, manage_messages=True)
+    return overwrites
+
 # ============
 # UI - Ticket Panel
 # ============
@@ -63,8 +173,7 @@ class TicketTypeSelect(discord.ui.Select):
 
         # Denúncia: se for ADM, a opção vira "Alinhamento" (ticket aberto pelo ADM e seleciona o infrator)
         if val == "denuncia":
-            cfg = load_config()
-            if is_admin_member(interaction.user, cfg["tickets"]["admin_role_ids"]):
+            if is_admin_member(interaction.user, get_int_list("tickets", "admin_role_ids")):
                 await interaction.response.send_modal(AlinhamentoModal(self.cog))
                 return
 
@@ -78,99 +187,120 @@ class TicketPanelView(discord.ui.View):
 # ============
 # UI - Ticket Channel controls
 # ============
-class TicketControlsView(discord.ui.View):
-    def __init__(self, cog: "TicketsCog", opener_id: int):
-        super().__init__(timeout=None)
-        self.cog = cog
+# Os botões levam o contexto no custom_id (DynamicItem): continuam funcionando após
+# restart sem nenhuma View em memória. Custom_ids antigos (sem sufixo) ainda são aceitos.
+def _tickets_cog(interaction: discord.Interaction) -> Optional["TicketsCog"]:
+    return interaction.client.get_cog("TicketsCog")  # type: ignore
+
+
+async def _require_admin(interaction: discord.Interaction) -> bool:
+    if is_admin_member(interaction.user, get_int_list("tickets", "admin_role_ids")):
+        return True
+    await interaction.response.send_message("Apenas ADM.", ephemeral=True)
+    return False
+
+
+_CONTROL_BUTTONS = {
+    "add_user": dict(label="Adicionar Policial", style=discord.ButtonStyle.primary, emoji="➕"),
+    "remove_user": dict(label="Remover Usuário", style=discord.ButtonStyle.secondary, emoji="➖"),
+    "toggle_mute": dict(label="Silenciar/Desbloquear", style=discord.ButtonStyle.secondary, emoji="🔇"),
+    "close": dict(label="Finalizar Ticket", style=discord.ButtonStyle.danger, emoji="✅"),
+}
+
+
+class TicketControlButton(
+    discord.ui.DynamicItem[discord.ui.Button],
+    template=r"ticket:(?P<action>add_user|remove_user|toggle_mute|close)(?::(?P<opener>[0-9]+))?",
+):
+    def __init__(self, action: str, opener_id: int):
+        super().__init__(discord.ui.Button(custom_id=f"ticket:{action}:{opener_id}", **_CONTROL_BUTTONS[action]))
+        self.action = action
         self.opener_id = opener_id
 
-    @discord.ui.button(label="Adicionar Policial", style=discord.ButtonStyle.primary, emoji="➕", custom_id="ticket:add_user")
-    async def add_user(self, interaction: discord.Interaction, button: discord.ui.Button):
-        cfg = load_config()
-        if not is_admin_member(interaction.user, cfg["tickets"]["admin_role_ids"]):
-            return await interaction.response.send_message("Apenas ADM.", ephemeral=True)
-        await interaction.response.send_modal(AddUserModal(self.cog))
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match: re.Match[str]):
+        opener = match["opener"]
+        if opener is None:
+            # mensagem antiga: o opener vem do estado do ticket
+            cog = _tickets_cog(interaction)
+            st = cog.ticket_state.get(interaction.channel_id, {}) if cog else {}
+            opener = st.get("opener_id", 0)
+        return cls(match["action"], int(opener))
 
-    @discord.ui.button(label="Remover Usuário", style=discord.ButtonStyle.secondary, emoji="➖", custom_id="ticket:remove_user")
-    async def remove_user(self, interaction: discord.Interaction, button: discord.ui.Button):
-        cfg = load_config()
-        if not is_admin_member(interaction.user, cfg["tickets"]["admin_role_ids"]):
-            return await interaction.response.send_message("Apenas ADM.", ephemeral=True)
-        await interaction.response.send_modal(RemoveUserModal(self.cog))
-
-    @discord.ui.button(label="Silenciar/Desbloquear", style=discord.ButtonStyle.secondary, emoji="🔇", custom_id="ticket:toggle_mute")
-    async def toggle_mute(self, interaction: discord.Interaction, button: discord.ui.Button):
-        cfg = load_config()
-        if not is_admin_member(interaction.user, cfg["tickets"]["admin_role_ids"]):
-            return await interaction.response.send_message("Apenas ADM.", ephemeral=True)
+    async def callback(self, interaction: discord.Interaction):
+        cog = _tickets_cog(interaction)
+        if cog is None or not await _require_admin(interaction):
+            return
+        if self.action == "add_user":
+            await interaction.response.send_modal(AddUserModal(cog))
+        elif self.action == "remove_user":
+            await interaction.response.send_modal(RemoveUserModal(cog))
+        elif self.action == "close":
+            await interaction.response.send_modal(CloseTicketModal(cog))
+        else:
+            await cog.toggle_mute(interaction, self.opener_id)
 
-        # IMPORTANT:
-        # Alterar permissões pode demorar e estourar o tempo do interaction.
-        # Então a gente dá defer imediatamente e responde via followup.
-        try:
-            await interaction.response.defer(ephemeral=True)
-        except Exception:
-            # já respondido/deferido
-            pass
 
-        channel = interaction.channel
-        if not isinstance(channel, discord.TextChannel):
-            return await interaction.followup.send("❌ Canal inválido.", ephemeral=True)
+class TicketControlsView(discord.ui.View):
+    def __init__(self, opener_id: int):
+        super().__init__(timeout=None)
+        for action in _CONTROL_BUTTONS:
+            self.add_item(TicketControlButton(action, opener_id))
 
-        member = interaction.guild.get_member(self.opener_id)
-        if not member:
-            try:
-                member = await interaction.guild.fetch_member(self.opener_id)
-            except Exception:
-                member = None
-        if not member:
-            return await interaction.followup.send("❌ Membro não encontrado.", ephemeral=True)
 
-        ow = channel.overwrites_for(member)
-        currently_muted = (ow.send_messages is False)
-        ow.view_channel = True
-        ow.read_message_history = True
-        ow.send_messages = True if currently_muted else False
+# embed do canal ADM ("Solicitante: <@id>" / "Canal: <#id>"), para mensagens antigas
+_ADM_OPENER_RE = re.compile(r"Solicitante: <@!?(\d+)>")
+_ADM_CHANNEL_RE = re.compile(r"Canal: <#(\d+)>")
 
-        try:
-            await channel.set_permissions(member, overwrite=ow, reason="Toggle mute no ticket")
-        except discord.Forbidden:
-            return await interaction.followup.send("❌ Sem permissão para alterar permissões do canal.", ephemeral=True)
 
-        await interaction.followup.send(
-            f"✅ {'Desbloqueado' if currently_muted else 'Silenciado'}: {member.mention}",
-            ephemeral=True
+class AssumeTicketButton(
+    discord.ui.DynamicItem[discord.ui.Button],
+    template=r"ticket:assume(?::(?P<ch>[0-9]+):(?P<opener>[0-9]+))?",
+):
+    def __init__(self, ticket_channel_id: int, opener_id: int):
+        super().__init__(
+            discord.ui.Button(
+                label="Assumir Ticket",
+                style=discord.ButtonStyle.primary,
+                emoji="🛡️",
+                custom_id=f"ticket:assume:{ticket_channel_id}:{opener_id}",
+            )
         )
-
-    @discord.ui.button(label="Finalizar Ticket", style=discord.ButtonStyle.danger, emoji="✅", custom_id="ticket:close")
-    async def close(self, interaction: discord.Interaction, button: discord.ui.Button):
-        cfg = load_config()
-        if not is_admin_member(interaction.user, cfg["tickets"]["admin_role_ids"]):
-            return await interaction.response.send_message("Apenas ADM.", ephemeral=True)
-        await interaction.response.send_modal(CloseTicketModal(self.cog))
-
-
-class AssumeTicketView(discord.ui.View):
-    def __init__(self, cog: "TicketsCog", ticket_channel_id: int, opener_id: int):
-        super().__init__(timeout=None)
-        self.cog = cog
         self.ticket_channel_id = ticket_channel_id
         self.opener_id = opener_id
 
-    @discord.ui.button(label="Assumir Ticket", style=discord.ButtonStyle.primary, emoji="🛡️", custom_id="ticket:assume")
-    async def assumir(self, interaction: discord.Interaction, button: discord.ui.Button):
-        cfg = load_config()
-        if not is_admin_member(interaction.user, cfg["tickets"]["admin_role_ids"]):
-            return await interaction.response.send_message("Apenas ADM.", ephemeral=True)
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match: re.Match[str]):
+        if match["ch"] is not None:
+            return cls(int(match["ch"]), int(match["opener"]))
+        desc = ""
+        if interaction.message and interaction.message.embeds:
+            desc = interaction.message.embeds[0].description or ""
+        ch = _ADM_CHANNEL_RE.search(desc)
+        opener = _ADM_OPENER_RE.search(desc)
+        if not ch or not opener:
+            raise ValueError("mensagem de ticket sem canal/solicitante no embed")
+        return cls(int(ch.group(1)), int(opener.group(1)))
+
+    async def callback(self, interaction: discord.Interaction):
+        cog = _tickets_cog(interaction)
+        if cog is None or not await _require_admin(interaction):
+            return
 
         try:
             await interaction.response.defer(ephemeral=True)
         except Exception:
             pass
 
-        await self.cog.assign_ticket(interaction.guild, self.ticket_channel_id, self.opener_id, interaction.user.id)
+        await cog.assign_ticket(interaction.guild, self.ticket_channel_id, self.opener_id, interaction.user.id)
         await interaction.followup.send("✅ Ticket assumido.", ephemeral=True)
 
+
+class AssumeTicketView(discord.ui.View):
+    def __init__(self, ticket_channel_id: int, opener_id: int):
+        super().__init__(timeout=None)
+        self.add_item(AssumeTicketButton(ticket_channel_id, opener_id))
+
 # ============
 # Modals
 # ============
@@ -295,27 +425,40 @@ class ExoneracaoModal(discord.ui.Modal, title="Solicitação de Exoneração"):
 # ============
 # Approval Views (cargos / exoneração)
 # ============
-class CargoDecisionView(discord.ui.View):
-    def __init__(self, cog:"TicketsCog", solicitante_id:int):
-        super().__init__(timeout=None)
-        self.cog = cog
+class CargoDecisionButton(
+    discord.ui.DynamicItem[discord.ui.Button],
+    template=r"cargo:(?P<action>aceitar|recusar):(?P<uid>[0-9]+)",
+):
+    def __init__(self, action: str, solicitante_id: int):
+        if action == "aceitar":
+            button = discord.ui.Button(label="Aceitar", style=discord.ButtonStyle.success, emoji="✅")
+        else:
+            button = discord.ui.Button(label="Recusar", style=discord.ButtonStyle.danger, emoji="⛔")
+        button.custom_id = f"cargo:{action}:{solicitante_id}"
+        super().__init__(button)
+        self.action = action
         self.solicitante_id = solicitante_id
 
-    @discord.ui.button(label="Aceitar", style=discord.ButtonStyle.success, emoji="✅")
-    async def aceitar(self, interaction: discord.Interaction, button: discord.ui.Button):
-        cfg = load_config()
-        if not is_admin_member(interaction.user, cfg["tickets"]["admin_role_ids"]):
-            return await interaction.response.send_message("Apenas ADM.", ephemeral=True)
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match: re.Match[str]):
+        return cls(match["action"], int(match["uid"]))
+
+    async def callback(self, interaction: discord.Interaction):
+        cog = _tickets_cog(interaction)
+        if cog is None or not await _require_admin(interaction):
+            return
+        if self.action == "recusar":
+            return await interaction.response.send_modal(CargoRecusarModal(cog, self.solicitante_id))
         await interaction.response.defer(ephemeral=True)
-        await self.cog.notify_user(self.solicitante_id, f"✅ Sua solicitação de **atualização de cargos** foi **ACEITA** por {interaction.user}.")
+        await cog.notify_user(self.solicitante_id, f"✅ Sua solicitação de **atualização de cargos** foi **ACEITA** por {interaction.user}.")
         await interaction.followup.send("Aceito e notificado.", ephemeral=True)
 
-    @discord.ui.button(label="Recusar", style=discord.ButtonStyle.danger, emoji="⛔")
-    async def recusar(self, interaction: discord.Interaction, button: discord.ui.Button):
-        cfg = load_config()
-        if not is_admin_member(interaction.user, cfg["tickets"]["admin_role_ids"]):
-            return await interaction.response.send_message("Apenas ADM.", ephemeral=True)
-        await interaction.response.send_modal(CargoRecusarModal(self.cog, self.solicitante_id))
+
+class CargoDecisionView(discord.ui.View):
+    def __init__(self, solicitante_id: int):
+        super().__init__(timeout=None)
+        self.add_item(CargoDecisionButton("aceitar", solicitante_id))
+        self.add_item(CargoDecisionButton("recusar", solicitante_id))
 
 class CargoRecusarModal(discord.ui.Modal, title="Recusar - Atualização de Cargos"):
     motivo = discord.ui.TextInput(label="Motivo", style=discord.TextStyle.paragraph, required=True)
@@ -330,35 +473,64 @@ class CargoRecusarModal(discord.ui.Modal, title="Recusar - Atualização de Carg
         await self.cog.notify_user(self.solicitante_id, f"⛔ Sua solicitação de **atualização de cargos** foi **RECUSADA**. Motivo: {self.motivo.value}")
         await interaction.followup.send("Recusado e notificado.", ephemeral=True)
 
-class ExoneracaoDecisionView(discord.ui.View):
-    def __init__(self, cog:"TicketsCog", payload:dict):
-        super().__init__(timeout=None)
-        self.cog=cog
-        self.payload=payload
+# campos do embed de solicitação -> chaves do payload de exoneração
+_EXONERACAO_FIELDS = {"ID no jogo": "id", "Nome": "nome", "Patente": "patente", "Unidade": "unidade", "Motivo": "motivo"}
 
-    @discord.ui.button(label="Aprovar", style=discord.ButtonStyle.success, emoji="✅")
-    async def aprovar(self, interaction: discord.Interaction, button: discord.ui.Button):
-        cfg=load_config()
-        if not is_admin_member(interaction.user, cfg["tickets"]["admin_role_ids"]):
-            return await interaction.response.send_message("Apenas ADM.", ephemeral=True)
+
+def _exoneracao_payload(message: Optional[discord.Message], solicitante_id: int) -> dict:
+    """Remonta o payload a partir do embed da solicitação (o solicitante vem do custom_id)."""
+    payload = {"solicitante_id": solicitante_id}
+    if message and message.embeds:
+        for field in message.embeds[0].fields:
+            key = _EXONERACAO_FIELDS.get(field.name or "")
+            if key:
+                payload[key] = field.value
+    return payload
+
+
+class ExoneracaoDecisionButton(
+    discord.ui.DynamicItem[discord.ui.Button],
+    template=r"exoneracao:(?P<action>aprovar|reprovar):(?P<uid>[0-9]+)",
+):
+    def __init__(self, action: str, solicitante_id: int):
+        if action == "aprovar":
+            button = discord.ui.Button(label="Aprovar", style=discord.ButtonStyle.success, emoji="✅")
+        else:
+            button = discord.ui.Button(label="Reprovar", style=discord.ButtonStyle.danger, emoji="⛔")
+        button.custom_id = f"exoneracao:{action}:{solicitante_id}"
+        super().__init__(button)
+        self.action = action
+        self.solicitante_id = solicitante_id
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match: re.Match[str]):
+        return cls(match["action"], int(match["uid"]))
+
+    async def callback(self, interaction: discord.Interaction):
+        cog = _tickets_cog(interaction)
+        if cog is None or not await _require_admin(interaction):
+            return
+        payload = _exoneracao_payload(interaction.message, self.solicitante_id)
+        if self.action == "reprovar":
+            return await interaction.response.send_modal(ExoneracaoRecusarModal(cog, payload))
         # Kick pode demorar (fetch_member) e pode falhar por permissão/hierarquia.
         # Então dá defer e responde no followup com status real.
         try:
             await interaction.response.defer(ephemeral=True)
         except Exception:
             pass
-        ok, detail = await self.cog.approve_exoneracao(interaction, self.payload)
+        ok, detail = await cog.approve_exoneracao(interaction, payload)
         await interaction.followup.send(
             ("✅ Exoneração aprovada e usuário removido do servidor." if ok else f"⚠️ Exoneração aprovada, mas **não consegui remover** o usuário.\n\n**Detalhe:** {detail}"),
             ephemeral=True
         )
 
-    @discord.ui.button(label="Reprovar", style=discord.ButtonStyle.danger, emoji="⛔")
-    async def reprovar(self, interaction: discord.Interaction, button: discord.ui.Button):
-        cfg=load_config()
-        if not is_admin_member(interaction.user, cfg["tickets"]["admin_role_ids"]):
-            return await interaction.response.send_message("Apenas ADM.", ephemeral=True)
-        await interaction.response.send_modal(ExoneracaoRecusarModal(self.cog, self.payload))
+
+class ExoneracaoDecisionView(discord.ui.View):
+    def __init__(self, solicitante_id: int):
+        super().__init__(timeout=None)
+        self.add_item(ExoneracaoDecisionButton("aprovar", solicitante_id))
+        self.add_item(ExoneracaoDecisionButton("reprovar", solicitante_id))
 
 class ExoneracaoRecusarModal(discord.ui.Modal, title="Reprovar Exoneração"):
     motivo = discord.ui.TextInput(label="Motivo", style=discord.TextStyle.paragraph, required=True)
@@ -378,16 +550,279 @@ class ExoneracaoRecusarModal(discord.ui.Modal, title="Reprovar Exoneração"):
 class TicketsCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.ticket_state: Dict[int, dict] = {}  # channel_id -> {opener_id, admin_id, last_user_ts, last_admin_ts}
-        self.reminder_loop.start()
+        # channel_id -> {opener_id, admin_id, last_user_ts, last_admin_ts}, persistido em data/
+        self.ticket_state = TicketStore()
+        # lembrete de inatividade: um prazo por ticket, re-armado a cada mensagem
+        self.reminders = DeadlineScheduler(self._fire_reminder)
+        # encerramento por inatividade (tickets.auto_close_after_hours)
+        self.idle_closer = DeadlineScheduler(self._fire_idle_close)
+        self._auto_close_sem = asyncio.Semaphore(max(1, get_int("tickets", "auto_close_concurrency", 3)))
+        self._auto_close_gate = asyncio.Lock()
+        self._last_auto_close = 0.0
+        self._closing: set[int] = set()
+        # pool de canais prontos (ids) + id da intro já enviada em cada um
+        self._pool: List[int] = []
+        self._pool_intro: Dict[int, int] = {}
+        self._pool_task: Optional[asyncio.Task] = None
+        # fila de espera quando todas as categorias estão cheias: fica no ticket_state.waiting
+        self._queue_lock = asyncio.Lock()
+        # tickets sendo criados agora por usuário (contam no max_open_per_user)
+        self._opening: Dict[int, int] = {}
+        self._tasks = TaskSet("TicketsCog")
+        # escolha do ADM na atribuição automática (tickets.auto_assign)
+        self.balancer = AdminLoadBalancer()
+        # busca em transcripts de tickets encerrados (/buscar_ticket)
+        self.index = TicketIndex()
+        self.sla = HistogramSet()
+        self._sla_last_summary = 0.0
+        self._sla_dirty = False
+        self._load_sla()
+        self.state_flush_loop.start()
+        self.sla_summary_loop.start()
+
+    async def cog_load(self):
+        self.reminders.start()
+        self.idle_closer.start()
+        self._tasks.spawn(self.rehydrate_tickets())
 
     def cog_unload(self):
-        self.reminder_loop.cancel()
+        self.reminders.stop()
+        self.idle_closer.stop()
+        self.state_flush_loop.cancel()
+        self.sla_summary_loop.cancel()
+        if self._sla_dirty:
+            write_atomic(SLA_PATH, self._dump_sla(), prefix=".sla-")
+        self._tasks.cancel_all()
+        self.ticket_state.close()
+        self.index.close()
+
+    @tasks.loop(seconds=5)
+    async def state_flush_loop(self):
+        await self.ticket_state.flush()
+        if self._sla_dirty:
+            self._sla_dirty = False
+            await asyncio.to_thread(write_atomic, SLA_PATH, self._dump_sla(), ".sla-")
+
+    # ------------
+    # SLA (histogramas)
+    # ------------
+    def _load_sla(self):
+        try:
+            with open(SLA_PATH, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception:
+            # primeiro resumo só depois de um intervalo completo de dados
+            self._sla_last_summary = time.time()
+            return
+        self.sla = HistogramSet.load(data.get("hists", {}))
+        self._sla_last_summary = float(data.get("last_summary", 0.0))
+
+    def _dump_sla(self) -> str:
+        return json.dumps({"hists": self.sla.dump(), "last_summary": self._sla_last_summary}, separators=(",", ":"))
+
+    def _record_sla(self, st: dict, metric: str, seconds: float):
+        self.sla.add("tipo", st.get("kind") or "?", metric, seconds)
+        admin_id = int(st.get("admin_id", 0))
+        if admin_id:
+            self.sla.add("adm", str(admin_id), metric, seconds)
+        self._sla_dirty = True
+
+    def _sla_embed(self) -> discord.Embed:
+        embed = discord.Embed(title="⏱️ SLA dos Tickets", color=discord.Color.blurple(), timestamp=discord.utils.utcnow())
+        kinds = self.sla.keys("tipo")
+        for metric, label in SLA_METRICS:
+            lines = []
+            for kind in kinds:
+                h = self.sla.get("tipo", kind, metric)
+                if h and h.count:
+                    lines.append(f"`{kind}` {_fmt_hist(h)}")
+            total = self.sla.total("tipo", metric)
+            if total.count and len(lines) > 1:
+                lines.append(f"**Total** {_fmt_hist(total)}")
+            embed.add_field(name=label, value="\n".join(lines)[:1024] or "Sem dados.", inline=False)
+
+        # ADMs com mais tickets encerrados
+        admins = []
+        for admin in self.sla.keys("adm"):
+            res = self.sla.get("adm", admin, "resolucao")
+            first = self.sla.get("adm", admin, "primeira_resposta")
+            admins.append((res.count if res else 0, admin, res, first))
+        admins.sort(reverse=True)
+        lines = []
+        for n, admin, res, first in admins[:10]:
+            parts = [f"<@{admin}> • {n} encerrado(s)"]
+            if first and first.count:
+                parts.append(f"1ª resp. p50 {_fmt_duration(first.quantile(0.5))}")
+            if res and res.count:
+                parts.append(f"resolução p50 {_fmt_duration(res.quantile(0.5))}")
+            lines.append(" • ".join(parts))
+        embed.add_field(name="Por ADM", value="\n".join(lines)[:1024] or "Sem dados.", inline=False)
+        embed.set_footer(text="p50/p90 com erro de até ~12% (histograma logarítmico)")
+        return embed
+
+    @app_commands.command(name="sla_tickets", description="Tempos de atendimento dos tickets (atribuição, 1ª resposta, resolução).")
+    async def sla_tickets(self, interaction: discord.Interaction):
+        if not is_admin_member(interaction.user, get_int_list("tickets", "admin_role_ids")):
+            return await interaction.response.send_message("Apenas ADM.", ephemeral=True)
+        await interaction.response.send_message(embed=self._sla_embed(), ephemeral=True)
+
+    @app_commands.command(name="buscar_ticket", description="Busca texto nos transcripts de tickets encerrados.")
+    @app_commands.describe(termo="Palavras a buscar (todas precisam aparecer na mesma mensagem)")
+    async def buscar_ticket(self, interaction: discord.Interaction, termo: str):
+        if not is_admin_member(interaction.user, get_int_list("tickets", "admin_role_ids")):
+            return await interaction.response.send_message("Apenas ADM.", ephemeral=True)
+        hits = await asyncio.to_thread(self.index.search, termo, 10)
+        if not hits:
+            return await interaction.response.send_message(f"Nenhum ticket encontrado para **{termo[:100]}**.", ephemeral=True)
+
+        embed = discord.Embed(title=f"🔎 Tickets: {termo[:200]}", color=discord.Color.blurple())
+        for h in hits:
+            link = f" • [transcript]({h['jump_url']})" if h["jump_url"] else ""
+            kind = f" ({h['kind']})" if h["kind"] else ""
+            embed.add_field(
+                name=f"{h['name']}{kind}"[:256],
+                value=(
+                    f"Fechado <t:{int(h['closed_ts'])}:d> • Solicitante <@{h['opener_id']}>{link}\n"
+                    f"> {h['author']}: {h['snip']}"
+                )[:1024],
+                inline=False,
+            )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @tasks.loop(hours=1)
+    async def sla_summary_loop(self):
+        hours = get_float("tickets", "sla_summary_hours", 24.0)
+        if hours <= 0 or time.time() - self._sla_last_summary < hours * 3600:
+            return
+        guild = self.bot.get_guild(load_config()["guild_id"])
+        if not guild:
+            return
+        try:
+            adm = await self.bot.channel_registry.resolve(guild, get_int("tickets", "channel_adm_ticket_id"))
+            await self.bot.outbound.submit(adm.id, lambda: adm.send(embed=self._sla_embed()), priority=PRIORITY_BACKGROUND)
+        except Exception:
+            return
+        self._sla_last_summary = time.time()
+        self._sla_dirty = True
+
+    @sla_summary_loop.before_loop
+    async def _before_sla_summary(self):
+        await self.bot.wait_until_ready()
+
+    # ------------
+    # Reconciliação do estado no startup
+    # ------------
+    async def rehydrate_tickets(self):
+        """Confere o estado salvo contra os canais da categoria de tickets.
+
+        Estado de canal que não existe mais é descartado; canal de ticket sem
+        estado (ex.: disco perdido num redeploy) é reconstruído em paralelo a
+        partir das permissões e do histórico recente.
+        """
+        await self.bot.wait_until_ready()
+        cfg = load_config()
+        guild = self.bot.get_guild(cfg["guild_id"])
+        if not guild:
+            return
+        if _thread_mode():
+            hub = _ticket_hub(guild)
+            if hub is None:
+                return
+            live = {th.id: th for th in hub.threads if th.type == discord.ChannelType.private_thread}
+            # thread arquivada (auto_archive_duration) sai do cache e do READY: busca na API
+            try:
+                async for th in hub.archived_threads(private=True, limit=None):
+                    live[th.id] = th
+            except discord.HTTPException:
+                pass  # sem Gerenciar Threads: o fetch_channel abaixo confere uma a uma
+        else:
+            categories = _ticket_categories(guild)
+            if not categories:
+                return
+
+            self._load_pool(guild)
+            self._schedule_pool_refill()
+
+            live = {ch.id: ch for cat in categories for ch in cat.text_channels if ch.topic != POOL_TOPIC}
+        for ch_id in self.ticket_state.keys():
+            if ch_id in live or guild.get_channel_or_thread(ch_id) is not None:
+                continue
+            # só descarta o estado quando a API confirma que o canal não existe mais
+            try:
+                await self.bot.fetch_channel(ch_id)
+            except discord.NotFound:
+                self.ticket_state.pop(ch_id)
+            except discord.HTTPException:
+                pass
+
+        sem = asyncio.Semaphore(REHYDRATE_CONCURRENCY)
+        missing = [ch for ch_id, ch in live.items() if ch_id not in self.ticket_state]
+        await asyncio.gather(*(self._rehydrate_one(ch, sem) for ch in missing), return_exceptions=True)
+        now = discord.utils.utcnow().timestamp()
+        for ch_id in self.ticket_state.keys():
+            st = self.ticket_state.get(ch_id)
+            if st is not None and not st.get("last_activity_ts"):
+                # estado salvo antes do last_activity_ts: o prazo de inatividade conta a partir de agora
+                self.ticket_state.touch(ch_id, last_activity_ts=now)
+        await self.ticket_state.flush()
+        for ch_id in self.ticket_state.keys():
+            self._arm_reminder(ch_id)
+        if self.ticket_state.waiting:
+            # fila salva antes do restart: vagas podem ter aberto com o bot fora do ar
+            await self._drain_queue(guild)
+
+    async def _rehydrate_one(self, ch: discord.TextChannel | discord.Thread, sem: asyncio.Semaphore):
+        opener_id = 0
+        if isinstance(ch, discord.TextChannel):
+            me = ch.guild.me
+            admin_role_ids = get_int_list("tickets", "admin_role_ids")
+            members = [
+                t for t, ow in ch.overwrites.items()
+                if isinstance(t, discord.Member) and not t.bot and (me is None or t.id != me.id) and ow.view_channel
+            ]
+            # no alinhamento o ADM que abriu também tem overwrite; o "opener" é o membro comum
+            members.sort(key=lambda m: is_admin_member(m, admin_role_ids))
+            if not members:
+                return
+            opener_id = members[0].id
+
+        admin_id = 0
+        last_seen: Dict[int, float] = {}
+        async with sem:
+            async for msg in ch.history(limit=100):
+                if msg.author.bot:
+                    m = _ASSUMED_RE.search(msg.content or "")
+                    if m and not admin_id:
+                        admin_id = int(m.group(1))
+                else:
+                    last_seen.setdefault(msg.author.id, msg.created_at.timestamp())
+            if not opener_id:
+                # thread não tem overwrites: o opener está no embed inicial
+                async for msg in ch.history(limit=5, oldest_first=True):
+                    for emb in msg.embeds:
+                        m = _OPENER_RE.search(emb.description or "")
+                        if m:
+                            opener_id = int(m.group(1))
+                            break
+                    if opener_id:
+                        break
+        if not opener_id:
+            return
+        now = discord.utils.utcnow().timestamp()
+        last_user_ts = last_seen.get(opener_id, 0.0)
+        last_admin_ts = last_seen.get(admin_id, 0.0)
+        self.ticket_state[ch.id] = {
+            "opener_id": opener_id,
+            "admin_id": admin_id,
+            "last_user_ts": last_user_ts or now,
+            "last_admin_ts": last_admin_ts or now,
+            "last_activity_ts": max(last_seen.values(), default=0.0) or now,
+        }
 
     @app_commands.command(name="setup_tickets", description="Cria/atualiza o painel de tickets.")
     async def setup_tickets(self, interaction: discord.Interaction):
         cfg = load_config()
-        ch = await interaction.guild.fetch_channel(cfg["tickets"]["panel_channel_id"])
+        ch = await self.bot.channel_registry.resolve(interaction.guild, cfg["tickets"]["panel_channel_id"])
         if not isinstance(ch, discord.TextChannel):
             return await interaction.response.send_message("Canal do painel de tickets inválido no config.json.", ephemeral=True)
 
@@ -401,7 +836,7 @@ class TicketsCog(commands.Cog):
 
         view = TicketPanelView(self)
 
-        panel_msg_id = cfg["tickets"].get("panel_message_id", 0)
+        panel_msg_id = get_int("tickets", "panel_message_id")
         msg=None
         if panel_msg_id:
             try:
@@ -422,7 +857,6 @@ class TicketsCog(commands.Cog):
     # Ticket creation
     # ------------
     async def open_ticket_channel(self, interaction: discord.Interaction, kind: str):
-        cfg = load_config()
         guild = interaction.guild
         opener: discord.Member = interaction.user  # type: ignore
 
@@ -431,31 +865,25 @@ class TicketsCog(commands.Cog):
         except Exception:
             pass
 
-        me = guild.me
-        if not me or not _can_create_channels(me):
-            return await interaction.followup.send("❌ Bot sem permissão **Gerenciar Canais**.", ephemeral=True)
-
-        # fetch category
-        category = guild.get_channel(cfg["tickets"]["category_id"])
-        if category is None:
-            try:
-                category = await guild.fetch_channel(cfg["tickets"]["category_id"])
-            except Exception:
-                category = None
-        if not isinstance(category, discord.CategoryChannel):
-            return await interaction.followup.send("❌ Categoria de tickets inválida no config.json.", ephemeral=True)
-
-        overwrites = _ticket_overwrites(guild, opener, cfg["tickets"]["admin_role_ids"])
-
-        # create channel
-        name = f"{kind}-{opener.display_name}".lower().replace(" ", "-")[:90]
+        err = self._check_ticket_setup(guild)
+        if err:
+            return await interaction.followup.send(err, ephemeral=True)
+
+        # admissão: limite de tickets por usuário e fila quando tudo estiver cheio
+        limit = get_int("tickets", "max_open_per_user", 0)
+        open_count = self._open_count(opener.id) + self._opening.get(opener.id, 0)
+        if limit and open_count >= limit:
+            return await interaction.followup.send(f"❌ Você já tem {open_count} ticket(s) aberto(s). Finalize antes de abrir outro.", ephemeral=True)
+        if opener.id in self.ticket_state.waiting:
+            return await interaction.followup.send(f"⏳ Você já está na fila de tickets. Posição: **{self._queue_position(opener.id)}**.", ephemeral=True)
+
+        # reserva a vaga antes do primeiro await: dois cliques rápidos não passam juntos
+        # pela checagem acima. Ao sair, o ticket já está no ticket_state (ou na fila).
+        self._opening[opener.id] = self._opening.get(opener.id, 0) + 1
         try:
-            ticket_channel = await guild.create_text_channel(
-                name=name,
-                category=category,
-                overwrites=overwrites,
-                reason="Abrir ticket"
-            )
+            ticket_channel, intro_id = await self._create_ticket(guild, opener, kind)
+            if ticket_channel is None:
+                self.ticket_state.enqueue(opener.id, kind)
         except discord.Forbidden:
             return await interaction.followup.send(
                 "❌ **403 Missing Permissions** ao criar o canal.\n"
@@ -463,55 +891,279 @@ class TicketsCog(commands.Cog):
                 "e se a categoria não está bloqueando o bot.",
                 ephemeral=True
             )
+        except discord.HTTPException as e:
+            log.warning("Falha ao criar ticket para %s: %s", opener.id, e)
+            return await interaction.followup.send(f"❌ O Discord recusou a criação do ticket ({e.status}). Tente novamente.", ephemeral=True)
+        finally:
+            n = self._opening.pop(opener.id, 1) - 1
+            if n > 0:
+                self._opening[opener.id] = n
+
+        if ticket_channel is None:
+            return await interaction.followup.send(
+                f"⏳ Todas as categorias de ticket estão cheias. Você entrou na fila (posição **{self._queue_position(opener.id)}**) "
+                "e receberá uma DM quando o ticket for aberto.",
+                ephemeral=True
+            )
+
+        # o usuário já recebe o link; intro, controles e aviso ADM vêm em seguida
+        await interaction.followup.send(f"✅ Ticket criado: {ticket_channel.mention}", ephemeral=True)
+        await self._announce_ticket(guild, ticket_channel, intro_id, kind, opener)
+        self._schedule_pool_refill()
+
+    def _check_ticket_setup(self, guild: discord.Guild) -> Optional[str]:
+        """Mensagem de erro se o bot não consegue abrir tickets no modo configurado."""
+        me = guild.me
+        if _thread_mode():
+            hub = _ticket_hub(guild)
+            if hub is None:
+                return "❌ Canal hub de tickets inválido no config.json."
+            if not me or not hub.permissions_for(me).create_private_threads:
+                return "❌ Bot sem permissão **Criar Threads Privadas** no canal hub."
+            return None
+        if not me or not _can_create_channels(me):
+            return "❌ Bot sem permissão **Gerenciar Canais**."
+        if not _ticket_categories(guild):
+            return "❌ Categoria de tickets inválida no config.json."
+        return None
+
+    async def _create_ticket_thread(self, guild: discord.Guild, name: str, members: List[discord.Member], reason: str) -> discord.Thread:
+        """Thread privada no hub; só quem é adicionado (e ADMs com Gerenciar Threads) a enxerga."""
+        hub = _ticket_hub(guild)
+        if hub is None:
+            raise RuntimeError("tickets.hub_channel_id inválido")
+        thread = await hub.create_thread(
+            name=name,
+            type=discord.ChannelType.private_thread,
+            invitable=False,
+            auto_archive_duration=10080,
+            reason=reason,
+        )
+        await asyncio.gather(*(thread.add_user(m) for m in members), return_exceptions=True)
+        return thread
+
+    async def _create_ticket(self, guild: discord.Guild, opener: discord.Member, kind: str) -> tuple[Optional[discord.TextChannel | discord.Thread], int]:
+        """Canal do pool ou novo canal na primeira categoria com vaga. (None, 0) = sem capacidade."""
+        name = f"{kind}-{opener.display_name}".lower().replace(" ", "-")[:90]
+        if _thread_mode():
+            thread = await self._create_ticket_thread(guild, name, [opener], "Abrir ticket")
+            self._init_ticket_state(thread.id, opener.id, kind=kind)
+            return thread, 0
+
+        overwrites = _ticket_overwrites(guild, opener, get_int_list("tickets", "admin_role_ids"))
+
+        # canal pré-aquecido: um único PATCH (nome + permissões); senão cria na hora
+        ticket_channel, intro_id = await self._take_pooled_channel(guild, name, overwrites)
+        if ticket_channel is None:
+            for category in _categories_with_room(guild):
+                try:
+                    ticket_channel = await guild.create_text_channel(
+                        name=name,
+                        category=category,
+                        overwrites=overwrites,
+                        reason="Abrir ticket"
+                    )
+                    break
+                except discord.HTTPException as e:
+                    if _is_capacity_error(e):
+                        # categoria encheu entre a checagem e a criação: tenta a próxima
+                        continue
+                    raise
+        if ticket_channel is None:
+            return None, 0
+        self._init_ticket_state(ticket_channel.id, opener.id, kind=kind)
+        return ticket_channel, intro_id
+
+    def _init_ticket_state(self, channel_id: int, opener_id: int, admin_id: int = 0, kind: str = ""):
+        now = discord.utils.utcnow().timestamp()
+        self.ticket_state[channel_id] = {
+            "opener_id": opener_id,
+            "admin_id": admin_id,
+            "last_user_ts": now,
+            "last_admin_ts": now,
+            "last_activity_ts": now,
+            "kind": kind,
+            "opened_ts": now,
+            "assigned_ts": now if admin_id else 0,
+            "first_admin_reply_ts": 0,
+        }
+        self._arm_reminder(channel_id)
+
+    # ------------
+    # Fila de espera
+    # ------------
+    def _open_count(self, user_id: int) -> int:
+        return sum(1 for _, st in self.ticket_state.items() if int(st.get("opener_id", 0)) == user_id)
+
+    def _queue_position(self, user_id: int) -> int:
+        return list(self.ticket_state.waiting).index(user_id) + 1
+
+    async def _drain_queue(self, guild: discord.Guild):
+        """Abre tickets para a fila, na ordem, enquanto houver vaga."""
+        async with self._queue_lock:
+            while self.ticket_state.waiting:
+                user_id, kind = next(iter(self.ticket_state.waiting.items()))
+                member = guild.get_member(user_id)
+                if member is None:
+                    try:
+                        member = await guild.fetch_member(user_id)
+                    except Exception:
+                        self.ticket_state.dequeue(user_id)
+                        continue
+                try:
+                    ticket_channel, intro_id = await self._create_ticket(guild, member, kind)
+                except discord.HTTPException as e:
+                    log.warning("Fila de tickets parada: %s", e)
+                    return
+                if ticket_channel is None:
+                    return
+                self.ticket_state.dequeue(user_id)
+                await self.notify_user(user_id, f"✅ Chegou sua vez! Seu ticket foi aberto: {ticket_channel.mention}")
+                await self._announce_ticket(guild, ticket_channel, intro_id, kind, member)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
+        # vaga liberada numa categoria de ticket (o cache já reflete a remoção aqui)
+        if not self.ticket_state.waiting or channel.category_id not in {c.id for c in _ticket_categories(channel.guild)}:
+            return
+        self._tasks.spawn(self._drain_queue(channel.guild))
 
+    async def _announce_ticket(self, guild: discord.Guild, ticket_channel: discord.TextChannel | discord.Thread, intro_id: int, kind: str, opener: discord.Member):
+        cfg = load_config()
         # notify channel
         embed = discord.Embed(
             title="📌 Ticket Aberto",
             description=f"Tipo: **{kind.upper()}**\nSolicitante: {opener.mention}",
             color=discord.Color.green()
         )
-        
-        # Mensagem inicial dentro do ticket (fixada) conforme o tipo
-        initial_map = {
-            "duvidas": (
-                "❓ Dúvidas",
-                "Utilize este espaço para esclarecer dúvidas relacionadas a procedimentos, regras, cursos ou funcionamento interno da Polícia."
-            ),
-            "denuncia": (
-                "🚨 Denúncia",
-                "Espaço para denunciar policiais que descumpram regras, procedimentos ou ajam de forma inadequada dentro da corporação."
-            ),
-        }
-        title, desc = initial_map.get(kind, ("🎫 Ticket", ""))
-        intro = discord.Embed(title=title, description=desc, color=discord.Color.dark_grey())
-        intro.set_footer(text="Aguarde um ADM assumir o atendimento.")
+
         try:
-            intro_msg = await ticket_channel.send(embed=intro)
-            await intro_msg.pin(reason="Mensagem inicial do ticket")
+            if intro_id:
+                # canal do pool: a intro já está enviada e fixada, só ganha o texto do tipo
+                await ticket_channel.get_partial_message(intro_id).edit(embed=_intro_embed(kind))
+            else:
+                intro_msg = await ticket_channel.send(embed=_intro_embed(kind))
+                await intro_msg.pin(reason="Mensagem inicial do ticket")
         except Exception:
             pass
 
-        await ticket_channel.send(embed=embed, view=TicketControlsView(self, opener.id))
+        await ticket_channel.send(embed=embed, view=TicketControlsView(opener.id))
 
         # notify admin channel
-        adm_ch = await guild.fetch_channel(cfg["tickets"]["channel_adm_ticket_id"])
+        adm_ch = await self.bot.channel_registry.resolve(guild, cfg["tickets"]["channel_adm_ticket_id"])
         adm_embed = discord.Embed(
             title="🛡️ Novo Ticket",
             description=f"Tipo: **{kind.upper()}**\nSolicitante: {opener.mention}\nCanal: {ticket_channel.mention}",
             color=discord.Color.orange()
         )
-        await adm_ch.send(embed=adm_embed, view=AssumeTicketView(self, ticket_channel.id, opener.id))
-
-        # init state
-        self.ticket_state[ticket_channel.id] = {
-            "opener_id": opener.id,
-            "admin_id": 0,
-            "last_user_ts": discord.utils.utcnow().timestamp(),
-            "last_admin_ts": discord.utils.utcnow().timestamp(),
-        }
+        # aviso de log: fila normal do dispatcher, atrás das respostas interativas
+        self.bot.outbound.post(adm_ch.id, lambda: adm_ch.send(embed=adm_embed, view=AssumeTicketView(ticket_channel.id, opener.id)))
 
-        await interaction.followup.send(f"✅ Ticket criado: {ticket_channel.mention}", ephemeral=True)
+        if get_bool("tickets", "auto_assign"):
+            await self._auto_assign(guild, ticket_channel.id, opener.id)
 
+    # ------------
+    # Atribuição automática
+    # ------------
+    def _assign_candidates(self, guild: discord.Guild, opener_id: int) -> List[int]:
+        """Membros com cargo ADM; com o intent de presença ativo, só quem não está offline."""
+        use_presence = self.bot.intents.presences
+        ids: Dict[int, None] = {}
+        for rid in get_int_list("tickets", "admin_role_ids"):
+            role = guild.get_role(rid)
+            if not role:
+                continue
+            for m in role.members:
+                if m.bot or m.id == opener_id:
+                    continue
+                if use_presence and m.status == discord.Status.offline:
+                    continue
+                ids[m.id] = None
+        return list(ids)
+
+    async def _auto_assign(self, guild: discord.Guild, channel_id: int, opener_id: int):
+        active: Dict[int, int] = {}
+        for _, st in self.ticket_state.items():
+            admin_id = int(st.get("admin_id", 0))
+            if admin_id:
+                active[admin_id] = active.get(admin_id, 0) + 1
+        admin_id = self.balancer.pick(self._assign_candidates(guild, opener_id), active)
+        if not admin_id:
+            # ninguém disponível: fica o botão "Assumir Ticket"
+            return
+        await self.assign_ticket(guild, channel_id, opener_id, admin_id)
+        await self.notify_user(admin_id, f"🛡️ Um ticket foi atribuído a você automaticamente: <#{channel_id}>")
+
+    # ------------
+    # Pool de canais pré-criados
+    # ------------
+    def _load_pool(self, guild: discord.Guild):
+        """Recupera canais do pool que sobraram de uma execução anterior (marcados pelo tópico)."""
+        for category in _ticket_categories(guild):
+            for ch in category.text_channels:
+                if ch.topic == POOL_TOPIC and ch.id not in self._pool:
+                    self._pool.append(ch.id)
+
+    async def _take_pooled_channel(self, guild: discord.Guild, name: str, overwrites) -> tuple[Optional[discord.TextChannel], int]:
+        while self._pool:
+            channel_id = self._pool.pop(0)
+            intro_id = self._pool_intro.pop(channel_id, 0)
+            ch = guild.get_channel(channel_id)
+            if not isinstance(ch, discord.TextChannel):
+                continue
+            try:
+                ch = await ch.edit(name=name, overwrites=overwrites, topic=None, reason="Abrir ticket")
+            except discord.NotFound:
+                continue
+            except discord.HTTPException:
+                # o canal continua livre: volta para o pool e este ticket sai de um canal novo
+                self._pool.append(channel_id)
+                if intro_id:
+                    self._pool_intro[channel_id] = intro_id
+                return None, 0
+            if not intro_id:
+                # pool recuperado no startup: procura a intro entre as fixadas (fora do caminho crítico)
+                try:
+                    pins = await ch.pins()
+                    intro_id = pins[0].id if pins else 0
+                except Exception:
+                    intro_id = 0
+            return ch, intro_id
+        return None, 0
+
+    def _schedule_pool_refill(self):
+        if _thread_mode() or get_int("tickets", "pool_size", 0) <= 0:
+            return
+        if self._pool_task is None or self._pool_task.done():
+            self._pool_task = self._tasks.spawn(self._refill_pool())
+
+    async def _refill_pool(self):
+        await self.bot.wait_until_ready()
+        cfg = load_config()
+        guild = self.bot.get_guild(cfg["guild_id"])
+        if not guild or not guild.me or not _can_create_channels(guild.me):
+            return
+        # um canal por vez: criação de canal tem rate limit apertado
+        while len(self._pool) < get_int("tickets", "pool_size", 0):
+            # fila tem prioridade sobre o pool; e sem vaga não há o que pré-criar
+            rooms = _categories_with_room(guild)
+            if self.ticket_state.waiting or not rooms:
+                return
+            category = rooms[0]
+            try:
+                ch = await guild.create_text_channel(
+                    name="ticket-livre",
+                    category=category,
+                    overwrites=_pool_overwrites(guild),
+                    topic=POOL_TOPIC,
+                    reason="Pool de tickets"
+                )
+                intro = await ch.send(embed=_intro_embed(None))
+                await intro.pin(reason="Mensagem inicial do ticket")
+            except discord.HTTPException:
+                return
+            self._pool_intro[ch.id] = intro.id
+            self._pool.append(ch.id)
 
     async def open_alinhamento_ticket(self, interaction: discord.Interaction, target_id: int, resumo: str):
         """Fluxo de denúncia usado por ADM: abre um ticket e coloca o infrator dentro do canal."""
@@ -523,19 +1175,17 @@ class TicketsCog(commands.Cog):
         if not is_admin_member(opener_admin, cfg["tickets"]["admin_role_ids"]):
             return await interaction.followup.send("Apenas ADM.", ephemeral=True)
 
-        me = guild.me
-        if not me or not _can_create_channels(me):
-            return await interaction.followup.send("❌ Bot sem permissão **Gerenciar Canais**.", ephemeral=True)
+        err = self._check_ticket_setup(guild)
+        if err:
+            return await interaction.followup.send(err, ephemeral=True)
 
-        # categoria
-        category = guild.get_channel(cfg["tickets"]["category_id"])
-        if category is None:
-            try:
-                category = await guild.fetch_channel(cfg["tickets"]["category_id"])
-            except Exception:
-                category = None
-        if not isinstance(category, discord.CategoryChannel):
-            return await interaction.followup.send("❌ Categoria de tickets inválida no config.json.", ephemeral=True)
+        # categoria: a primeira com vaga (só no modo canal)
+        category = None
+        if not _thread_mode():
+            rooms = _categories_with_room(guild)
+            if not rooms:
+                return await interaction.followup.send("❌ Todas as categorias de ticket estão cheias.", ephemeral=True)
+            category = rooms[0]
 
         # alvo
         target_member = guild.get_member(target_id)
@@ -560,12 +1210,16 @@ class TicketsCog(commands.Cog):
         name_base = (target_member.display_name if target_member else str(target_id))
         name = f"alinhamento-{name_base}".lower().replace(" ", "-")[:90]
         try:
-            ticket_channel = await guild.create_text_channel(
-                name=name,
-                category=category,
-                overwrites=overwrites,
-                reason="Abrir ticket de alinhamento"
-            )
+            if category is None:
+                members = [opener_admin] + ([target_member] if target_member else [])
+                ticket_channel = await self._create_ticket_thread(guild, name, members, "Abrir ticket de alinhamento")
+            else:
+                ticket_channel = await guild.create_text_channel(
+                    name=name,
+                    category=category,
+                    overwrites=overwrites,
+                    reason="Abrir ticket de alinhamento"
+                )
         except discord.Forbidden:
             return await interaction.followup.send("❌ Sem permissão para criar canal na categoria de tickets.", ephemeral=True)
 
@@ -589,40 +1243,45 @@ class TicketsCog(commands.Cog):
         # Controles do ticket (opener_id é o alvo)
         await ticket_channel.send(
             embed=discord.Embed(title="📌 Ticket Aberto", description="Controles do ticket abaixo.", color=discord.Color.green()),
-            view=TicketControlsView(self, target_id)
+            view=TicketControlsView(target_id)
         )
 
         # Aviso no canal ADM (sem precisar assumir)
-        adm_ch = await guild.fetch_channel(cfg["tickets"]["channel_adm_ticket_id"])
+        adm_ch = await self.bot.channel_registry.resolve(guild, cfg["tickets"]["channel_adm_ticket_id"])
         adm_embed = discord.Embed(
             title="🛡️ Novo Alinhamento (Denúncia)",
             description=f"Canal: {ticket_channel.mention}\nAlvo: {target_member.mention if target_member else f'`{target_id}`'}\nIniciado por: {opener_admin.mention}",
             color=discord.Color.orange()
         )
-        await adm_ch.send(embed=adm_embed)
+        self.bot.outbound.post(adm_ch.id, lambda: adm_ch.send(embed=adm_embed))
 
         # Estado: considera o alvo como "opener" e o ADM já assumido
-        now = discord.utils.utcnow().timestamp()
-        self.ticket_state[ticket_channel.id] = {
-            "opener_id": target_id,
-            "admin_id": opener_admin.id,
-            "last_user_ts": now,
-            "last_admin_ts": now,
-        }
+        self._init_ticket_state(ticket_channel.id, target_id, opener_admin.id, kind="alinhamento")
 
         await interaction.followup.send(f"✅ Alinhamento criado: {ticket_channel.mention}", ephemeral=True)
 
     async def assign_ticket(self, guild: discord.Guild, channel_id: int, opener_id: int, admin_id: int):
         # set state
-        st = self.ticket_state.get(channel_id, {"opener_id": opener_id, "admin_id": 0, "last_user_ts": discord.utils.utcnow().timestamp(), "last_admin_ts": discord.utils.utcnow().timestamp()})
+        now = discord.utils.utcnow().timestamp()
+        st = self.ticket_state.get(channel_id, {"opener_id": opener_id, "admin_id": 0, "last_user_ts": now, "last_admin_ts": now, "last_activity_ts": now})
         st["admin_id"] = admin_id
+        if not st.get("assigned_ts"):
+            st["assigned_ts"] = discord.utils.utcnow().timestamp()
+            if st.get("opened_ts"):
+                self._record_sla(st, "atribuicao", st["assigned_ts"] - float(st["opened_ts"]))
         self.ticket_state[channel_id] = st
+        self._arm_reminder(channel_id)
 
         try:
-            ch = await guild.fetch_channel(channel_id)
+            ch = await self.bot.channel_registry.resolve(guild, channel_id)
         except Exception:
             return
-        if isinstance(ch, discord.TextChannel):
+        if isinstance(ch, discord.Thread):
+            try:
+                await ch.add_user(discord.Object(id=admin_id))
+            except Exception:
+                pass
+        if isinstance(ch, TICKET_CHANNEL_TYPES):
             await ch.send(f"🛡️ Ticket assumido por <@{admin_id}>.")
 
     # ------------
@@ -630,49 +1289,174 @@ class TicketsCog(commands.Cog):
     # ------------
     async def add_user_to_ticket(self, interaction: discord.Interaction, user_id: int):
         ch = interaction.channel
-        if not isinstance(ch, discord.TextChannel):
+        if not isinstance(ch, TICKET_CHANNEL_TYPES):
             return
         try:
             member = await interaction.guild.fetch_member(user_id)
         except Exception:
             return
-        await ch.set_permissions(member, view_channel=True, send_messages=True, read_message_history=True)
+        if isinstance(ch, discord.Thread):
+            await ch.add_user(member)
+        else:
+            await ch.set_permissions(member, view_channel=True, send_messages=True, read_message_history=True)
 
     async def remove_user_from_ticket(self, interaction: discord.Interaction, user_id: int):
         ch = interaction.channel
-        if not isinstance(ch, discord.TextChannel):
+        if not isinstance(ch, TICKET_CHANNEL_TYPES):
             return
         try:
             member = await interaction.guild.fetch_member(user_id)
         except Exception:
             return
-        await ch.set_permissions(member, overwrite=None)
+        if isinstance(ch, discord.Thread):
+            await ch.remove_user(member)
+        else:
+            await ch.set_permissions(member, overwrite=None)
+
+    async def toggle_mute(self, interaction: discord.Interaction, opener_id: int):
+        # IMPORTANT:
+        # Alterar permissões pode demorar e estourar o tempo do interaction.
+        # Então a gente dá defer imediatamente e responde via followup.
+        try:
+            await interaction.response.defer(ephemeral=True)
+        except Exception:
+            # já respondido/deferido
+            pass
+
+        channel = interaction.channel
+        if isinstance(channel, discord.Thread):
+            # thread não tem permissão por membro: trava a thread inteira (só quem tem
+            # Gerenciar Threads, ou seja, os ADMs, continua escrevendo)
+            locked = not channel.locked
+            try:
+                await channel.edit(locked=locked, archived=False, reason="Toggle mute no ticket")
+            except discord.Forbidden:
+                return await interaction.followup.send("❌ Sem permissão **Gerenciar Threads** no canal hub.", ephemeral=True)
+            return await interaction.followup.send(
+                "🔇 Ticket travado: só ADMs podem escrever." if locked else "✅ Ticket destravado.",
+                ephemeral=True,
+            )
+        if not isinstance(channel, discord.TextChannel):
+            return await interaction.followup.send("❌ Canal inválido.", ephemeral=True)
+
+        member = interaction.guild.get_member(opener_id)
+        if not member:
+            try:
+                member = await interaction.guild.fetch_member(opener_id)
+            except Exception:
+                member = None
+        if not member:
+            return await interaction.followup.send("❌ Membro não encontrado.", ephemeral=True)
+
+        ow = channel.overwrites_for(member)
+        currently_muted = (ow.send_messages is False)
+        ow.view_channel = True
+        ow.read_message_history = True
+        ow.send_messages = True if currently_muted else False
+
+        try:
+            await channel.set_permissions(member, overwrite=ow, reason="Toggle mute no ticket")
+        except discord.Forbidden:
+            return await interaction.followup.send("❌ Sem permissão para alterar permissões do canal.", ephemeral=True)
+
+        await interaction.followup.send(
+            f"✅ {'Desbloqueado' if currently_muted else 'Silenciado'}: {member.mention}",
+            ephemeral=True
+        )
 
     async def close_ticket(self, interaction: discord.Interaction, motivo: str):
-        cfg = load_config()
         ch = interaction.channel
-        if not isinstance(ch, discord.TextChannel):
+        if not isinstance(ch, TICKET_CHANNEL_TYPES):
             return await interaction.followup.send("❌ Canal inválido.", ephemeral=True)
+        if ch.id in self._closing:
+            return await interaction.followup.send("⏳ Este ticket já está sendo finalizado.", ephemeral=True)
+        await self._close_ticket(ch, motivo)
 
+    async def _close_ticket(self, ch: discord.TextChannel | discord.Thread, motivo: str, auto: bool = False):
+        """Caminho único de encerramento (manual ou por inatividade): transcript, DMs, remoção e estado."""
+        if ch.id in self._closing:
+            return
+        self._closing.add(ch.id)
+        try:
+            await self._close_ticket_inner(ch, motivo, auto)
+        finally:
+            self._closing.discard(ch.id)
+
+    async def _close_ticket_inner(self, ch: discord.TextChannel | discord.Thread, motivo: str, auto: bool):
+        cfg = load_config()
         st = self.ticket_state.get(ch.id, {})
         opener_id = int(st.get("opener_id", 0))
         admin_id = int(st.get("admin_id", 0))
 
-        # transcript
-        buf = io.StringIO()
-        async for msg in ch.history(limit=2000, oldest_first=True):
-            buf.write(f"[{msg.created_at.isoformat()}] {msg.author} ({msg.author.id}): {msg.content}\n")
-        txt = buf.getvalue().encode("utf-8")
-        file = discord.File(io.BytesIO(txt), filename=f"transcript-{ch.id}.txt")
+        # transcript: histórico completo, em disco e comprimido; divide em partes se passar do limite de upload
+        reg = await self.bot.channel_registry.resolve(ch.guild, cfg["tickets"]["channel_registro_ticket_id"])
+        file_limit = upload_limit(ch.guild)
+        max_upload = file_limit - PART_MARGIN_BYTES
+        budget = 0
+        if get_bool("tickets", "archive_attachments"):
+            budget = min(int(get_float("tickets", "archive_max_mb", 8.0) * 1024 * 1024), max_upload)
+
+        # índice de busca alimentado página a página enquanto o transcript é gerado
+        await asyncio.to_thread(self.index.discard, ch.id)
 
-        reg = await interaction.guild.fetch_channel(cfg["tickets"]["channel_registro_ticket_id"])
-        await reg.send(content=f"🧾 Ticket {ch.name} finalizado. Motivo: {motivo}", file=file)
+        async def index_batch(msgs: List[discord.Message]):
+            rows = [(m.created_at.timestamp(), str(m.author), m.content) for m in msgs if m.content]
+            if rows:
+                await asyncio.to_thread(self.index.add_lines, ch.id, rows)
+
+        spool = await spool_channel(ch, f"transcript-{ch.id}", file_limit, attachment_budget=budget, on_batch=index_batch)
+        try:
+            parts = spool.close()
+            header = f"🧾 Ticket {ch.name} finalizado. Motivo: {motivo}"
+            concurrency = get_int("tickets", "archive_concurrency", 4)
+            # anexos são best-effort: uma falha aqui não pode impedir o encerramento
+            # (e um novo /fechar repostaria o transcript)
+            upload = None
+            archive_error: Optional[Exception] = None
+            combined = bool(spool.attachments) and spool.size() + spool.attachment_bytes <= max_upload
+            if combined:
+                # tudo cabe num upload só: transcript + anexos no mesmo zip
+                try:
+                    path = await build_archive(spool, parts, concurrency)
+                    upload = await reg.send(content=header, file=discord.File(path, filename=f"ticket-{ch.id}.zip"))
+                except (discord.HTTPException, OSError) as e:
+                    archive_error = e
+            if upload is None:
+                for i, path in enumerate(parts):
+                    content = header if i == 0 else None
+                    if len(parts) > 1:
+                        content = (content + "\n" if content else "") + f"Parte {i + 1}/{len(parts)}"
+                    sent = await reg.send(content=content, file=discord.File(path, filename=spool.filename(i)))
+                    upload = upload or sent
+                if spool.attachments and not combined:
+                    try:
+                        path = await build_archive(spool, [], concurrency)
+                        await reg.send(content=f"📎 Anexos do ticket {ch.name}", file=discord.File(path, filename=f"anexos-{ch.id}.zip"))
+                    except (discord.HTTPException, OSError) as e:
+                        archive_error = e
+            if archive_error is not None:
+                log.warning("Anexos do ticket %s não arquivados: %s", ch.id, archive_error)
+                try:
+                    await reg.send(f"⚠️ Anexos do ticket {ch.name} não arquivados ({len(spool.attachments)} arquivo(s)): {archive_error}")
+                except discord.HTTPException:
+                    pass
+        finally:
+            spool.cleanup()
+
+        await asyncio.to_thread(
+            self.index.finish,
+            ch.id, ch.name, str(st.get("kind") or ""), opener_id, admin_id,
+            discord.utils.utcnow().timestamp(), motivo, upload.jump_url if upload else "",
+        )
 
         # DM notify
         if opener_id:
             await self.notify_user(opener_id, f"✅ Seu ticket **{ch.name}** foi finalizado. Motivo: {motivo}")
         if admin_id:
-            await self.notify_user(admin_id, f"✅ Você finalizou o ticket **{ch.name}**. Motivo: {motivo}")
+            if auto:
+                await self.notify_user(admin_id, f"✅ O ticket **{ch.name}** que você assumiu foi finalizado automaticamente. Motivo: {motivo}")
+            else:
+                await self.notify_user(admin_id, f"✅ Você finalizou o ticket **{ch.name}**. Motivo: {motivo}")
 
         # delete channel
         try:
@@ -680,36 +1464,104 @@ class TicketsCog(commands.Cog):
         except Exception:
             pass
 
+        if st.get("opened_ts"):
+            self._record_sla(st, "resolucao", discord.utils.utcnow().timestamp() - float(st["opened_ts"]))
         self.ticket_state.pop(ch.id, None)
+        self.reminders.cancel(ch.id)
+        self.idle_closer.cancel(ch.id)
 
     # ------------
-    # Reminders (1h)
+    # Encerramento automático por inatividade
     # ------------
-    @tasks.loop(minutes=5)
-    async def reminder_loop(self):
-        cfg = load_config()
-        guild = self.bot.get_guild(cfg["guild_id"])
-        if not guild:
+    def _idle_deadline(self, st: dict) -> Optional[float]:
+        hours = get_float("tickets", "auto_close_after_hours", 0.0)
+        if hours <= 0:
+            return None
+        # só mensagens humanas contam: o lembrete mexe em last_*_ts e adiaria o prazo para sempre
+        last = float(st.get("last_activity_ts", 0) or 0)
+        return last + hours * 3600 if last else None
+
+    def _arm_idle_close(self, channel_id: int):
+        st = self.ticket_state.get(channel_id)
+        when = self._idle_deadline(st) if st else None
+        if when is None:
+            self.idle_closer.cancel(channel_id)
+        else:
+            self.idle_closer.arm(channel_id, when)
+
+    async def _fire_idle_close(self, channel_id: int):
+        st = self.ticket_state.get(channel_id)
+        when = self._idle_deadline(st) if st else None
+        if when is None:
+            return
+        if discord.utils.utcnow().timestamp() < when:
+            self.idle_closer.arm(channel_id, when)
+            return
+        guild = self.bot.get_guild(load_config()["guild_id"])
+        ch = guild.get_channel_or_thread(channel_id) if guild else None
+        if not isinstance(ch, TICKET_CHANNEL_TYPES):
+            # canal sumiu fora do bot
+            self.ticket_state.pop(channel_id, None)
+            self.reminders.cancel(channel_id)
             return
-        now = discord.utils.utcnow().timestamp()
-        limit_sec = int(cfg["tickets"].get("notify_after_minutes", 60)) * 60
 
-        for ch_id, st in list(self.ticket_state.items()):
-            admin_id = int(st.get("admin_id", 0))
-            opener_id = int(st.get("opener_id", 0))
-            # if no admin assigned yet, skip reminders
-            if not admin_id or not opener_id:
-                continue
+        # limite global de encerramentos simultâneos + espaçamento entre inícios:
+        # uma varredura com dezenas de tickets não estoura rate limit nem trava as interações
+        async with self._auto_close_sem:
+            async with self._auto_close_gate:
+                wait = self._last_auto_close + AUTO_CLOSE_SPACING_SECONDS - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                self._last_auto_close = time.monotonic()
+            if channel_id not in self.ticket_state:
+                return
+            hours = get_float("tickets", "auto_close_after_hours", 0.0)
+            try:
+                await self._close_ticket(ch, f"Inatividade ({hours:g}h sem mensagens)", auto=True)
+            except Exception:
+                # tenta de novo mais tarde
+                self.idle_closer.arm(channel_id, discord.utils.utcnow().timestamp() + 600)
+
+    # ------------
+    # Reminders (1h)
+    # ------------
+    def _reminder_deadline(self, st: dict) -> Optional[float]:
+        # sem ADM assumido não há lembrete
+        if not int(st.get("admin_id", 0)) or not int(st.get("opener_id", 0)):
+            return None
+        limit_sec = get_int("tickets", "notify_after_minutes", 60) * 60
+        now = discord.utils.utcnow().timestamp()
+        last = float(min(st.get("last_user_ts", now), st.get("last_admin_ts", now)))
+        return last + limit_sec
+
+    def _arm_reminder(self, channel_id: int):
+        st = self.ticket_state.get(channel_id)
+        when = self._reminder_deadline(st) if st else None
+        if when is None:
+            self.reminders.cancel(channel_id)
+        else:
+            self.reminders.arm(channel_id, when)
+        # o prazo de inatividade anda junto com o do lembrete
+        self._arm_idle_close(channel_id)
 
-            # We can't reliably detect last message author without message listeners here.
-            # Minimal: ping both if ticket exists and idle > limit
-            last = float(min(st.get("last_user_ts", now), st.get("last_admin_ts", now)))
-            if now - last > limit_sec:
-                await self.notify_user(admin_id, "⏰ Você tem um ticket sem resposta há mais de 1 hora.")
-                await self.notify_user(opener_id, "⏰ Seu ticket está sem resposta há mais de 1 hora. Aguarde ou reabra se necessário.")
-                st["last_user_ts"] = now
-                st["last_admin_ts"] = now
-                self.ticket_state[ch_id] = st
+    async def _fire_reminder(self, channel_id: int):
+        st = self.ticket_state.get(channel_id)
+        if not st:
+            return
+        when = self._reminder_deadline(st)
+        if when is None:
+            return
+        now = discord.utils.utcnow().timestamp()
+        if now < when:
+            # notify_after_minutes mudou ou houve atividade: só re-arma
+            self.reminders.arm(channel_id, when)
+            return
+        admin_id = int(st.get("admin_id", 0))
+        opener_id = int(st.get("opener_id", 0))
+        await self.notify_user(admin_id, "⏰ Você tem um ticket sem resposta há mais de 1 hora.")
+        await self.notify_user(opener_id, "⏰ Seu ticket está sem resposta há mais de 1 hora. Aguarde ou reabra se necessário.")
+        self.ticket_state.touch(channel_id, last_user_ts=now, last_admin_ts=now)
+        self._arm_reminder(channel_id)
 
     @commands.Cog.listener("on_message")
     async def on_message(self, msg: discord.Message):
@@ -719,19 +1571,35 @@ class TicketsCog(commands.Cog):
         if not st:
             return
         now = discord.utils.utcnow().timestamp()
-        # update last message timestamps
+        # qualquer mensagem humana conta como atividade (o lembrete mexe em last_*_ts, então não serve)
+        self.ticket_state.touch(msg.channel.id, last_activity_ts=now)
+        # update last message timestamps (buffer em memória; vai pro disco no state_flush_loop)
         if int(st.get("admin_id", 0)) == msg.author.id:
-            st["last_admin_ts"] = now
+            # resposta à mensagem mais antiga ainda sem resposta do usuário: alimenta o
+            # tempo médio de resposta do ADM (abertura e lembretes não contam)
+            pending = float(st.get("unanswered_user_ts", 0) or 0)
+            if pending:
+                self.balancer.observe(msg.author.id, now - pending)
+                self.ticket_state.touch(msg.channel.id, unanswered_user_ts=0)
+            if st.get("assigned_ts") and not st.get("first_admin_reply_ts"):
+                self._record_sla(st, "primeira_resposta", now - float(st["assigned_ts"]))
+                self.ticket_state.touch(msg.channel.id, first_admin_reply_ts=now)
+            self.ticket_state.touch(msg.channel.id, last_admin_ts=now)
         elif int(st.get("opener_id", 0)) == msg.author.id:
-            st["last_user_ts"] = now
-        self.ticket_state[msg.channel.id] = st
+            self.ticket_state.touch(msg.channel.id, last_user_ts=now)
+            if not st.get("unanswered_user_ts"):
+                self.ticket_state.touch(msg.channel.id, unanswered_user_ts=now)
+        else:
+            self._arm_idle_close(msg.channel.id)
+            return
+        self._arm_reminder(msg.channel.id)
 
     # ------------
     # Cargo request
     # ------------
     async def handle_cargo_request(self, interaction: discord.Interaction, data: dict):
         cfg = load_config()
-        reg = await interaction.guild.fetch_channel(cfg["tickets"]["channel_registro_ticket_id"])
+        reg = await self.bot.channel_registry.resolve(interaction.guild, cfg["tickets"]["channel_registro_ticket_id"])
         solicitante_id = int(data["solicitante_id"])
 
         embed = discord.Embed(title="🪪 Solicitação - Atualizar Cargos", color=discord.Color.blue())
@@ -742,7 +1610,7 @@ class TicketsCog(commands.Cog):
         embed.add_field(name="Unidade", value=data["unidade"], inline=True)
         embed.add_field(name="Autorizado", value=data["autorizado"], inline=False)
 
-        await reg.send(embed=embed, view=CargoDecisionView(self, solicitante_id))
+        await reg.send(embed=embed, view=CargoDecisionView(solicitante_id))
         await interaction.followup.send("✅ Solicitação enviada para análise.", ephemeral=True)
 
     # ------------
@@ -750,7 +1618,7 @@ class TicketsCog(commands.Cog):
     # ------------
     async def handle_exoneracao_request(self, interaction: discord.Interaction, data: dict):
         cfg = load_config()
-        adm = await interaction.guild.fetch_channel(cfg["tickets"]["channel_adm_ticket_id"])
+        adm = await self.bot.channel_registry.resolve(interaction.guild, cfg["tickets"]["channel_adm_ticket_id"])
 
         embed = discord.Embed(title="📤 Solicitação de Exoneração", color=discord.Color.red())
         embed.add_field(name="Solicitante", value=f"<@{int(data['solicitante_id'])}>", inline=False)
@@ -760,13 +1628,13 @@ class TicketsCog(commands.Cog):
         embed.add_field(name="Unidade", value=data["unidade"], inline=True)
         embed.add_field(name="Motivo", value=data["motivo"][:1000], inline=False)
 
-        await adm.send(embed=embed, view=ExoneracaoDecisionView(self, data))
+        await adm.send(embed=embed, view=ExoneracaoDecisionView(int(data["solicitante_id"])))
         await interaction.followup.send("✅ Solicitação enviada para análise (ADM).", ephemeral=True)
 
     async def approve_exoneracao(self, interaction: discord.Interaction, payload: dict) -> tuple[bool, str]:
         cfg = load_config()
         guild = interaction.guild
-        ex_ch = await guild.fetch_channel(cfg["exoneracao"]["channel_exonerados_id"])
+        ex_ch = await self.bot.channel_registry.resolve(guild, cfg["exoneracao"]["channel_exonerados_id"])
 
         # IMPORTANTe: o alvo a ser removido do servidor é SEMPRE quem solicitou a exoneração.
         # O campo "id" do payload é o ID no jogo (RID) e NÃO deve ser usado para kick.
@@ -860,4 +1728,5 @@ class TicketsCog(commands.Cog):
 async def setup(bot: commands.Bot):
     cog = TicketsCog(bot)
     bot.add_view(TicketPanelView(cog))
+    bot.add_dynamic_items(TicketControlButton, AssumeTicketButton, CargoDecisionButton, ExoneracaoDecisionButton)
     await bot.add_cog(cog)
\ No newline at end of file
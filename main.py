@@ -4,7 +4,9 @@ import os, logging
 import discord
 from discord.ext import commands
 from dotenv import load_dotenv
-from utils.config import load_config
+from utils.config import load_config, flush_config
+from utils.channels import ChannelRegistry
+from utils.outbound import OutboundDispatcher
 
 logging.basicConfig(level=logging.INFO)
 
@@ -22,10 +24,26 @@ intents = discord.Intents.default()
 intents.guilds = True
 intents.members = True
 intents.messages = True
-intents.message_content = False
+# texto das mensagens: transcripts e busca (/buscar_ticket) dos tickets.
+# Intent privilegiado: ativar também no Developer Portal (Bot > Message Content Intent).
+intents.message_content = True
 
 class HypeBot(commands.Bot):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.channel_registry = ChannelRegistry()
+        # escritas de fundo (logs, edição do ranking) com prioridade e coalescência
+        self.outbound = OutboundDispatcher()
+
     async def setup_hook(self):
+        # Canais do config.json resolvidos pelo cache do gateway (sem REST por interação).
+        # O cache só fica populado quando a guild chega, então o prime é feito no on_guild_available.
+        reg = self.channel_registry
+        self.add_listener(self._prime_channel_registry, "on_guild_available")
+        self.add_listener(reg.on_guild_channel_update, "on_guild_channel_update")
+        self.add_listener(reg.on_guild_channel_delete, "on_guild_channel_delete")
+        self.add_listener(reg.on_thread_delete, "on_thread_delete")
+
         await self.load_extension("cogs.prisao")
         await self.load_extension("cogs.tickets")
         await self.load_extension("cogs.admin_panel")
@@ -39,6 +57,17 @@ class HypeBot(commands.Bot):
         self.tree.copy_global_to(guild=guild)
         await self.tree.sync(guild=guild)
 
+    async def _prime_channel_registry(self, guild: discord.Guild):
+        if guild.id == GUILD_ID:
+            n = self.channel_registry.prime(guild, load_config())
+            logging.info("Canais do config resolvidos pelo cache: %s", n)
+
+    async def close(self):
+        # garante que saves agrupados do config.json cheguem ao disco
+        await flush_config()
+        await self.outbound.drain()
+        await super().close()
+
 bot = HypeBot(command_prefix=cfg.get("bot", {}).get("command_prefix","!"), intents=intents)
 
 @bot.event
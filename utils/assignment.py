@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import random
+from typing import Dict, Iterable, Optional
+
+# peso da resposta mais recente na média móvel (EWMA) do tempo de resposta
+EWMA_ALPHA = 0.3
+# tempo de resposta assumido para um ADM sem histórico (segundos)
+DEFAULT_RESPONSE_SECONDS = 600.0
+
+
+class AdminLoadBalancer:
+    """Escolhe o ADM para um ticket novo.
+
+    Score = (tickets ativos + 1) × tempo médio de resposta (EWMA): ganha quem
+    tem menos tickets, e entre cargas iguais, quem costuma responder mais rápido.
+    """
+
+    def __init__(self):
+        self.response_ewma: Dict[int, float] = {}
+
+    def observe(self, admin_id: int, seconds: float) -> None:
+        if seconds < 0:
+            return
+        prev = self.response_ewma.get(admin_id)
+        self.response_ewma[admin_id] = seconds if prev is None else prev + EWMA_ALPHA * (seconds - prev)
+
+    def expected_response(self, admin_id: int) -> float:
+        v = self.response_ewma.get(admin_id)
+        if v is not None:
+            return max(v, 1.0)
+        # sem histórico: média dos outros, para não favorecer nem punir quem é novo
+        if self.response_ewma:
+            return max(sum(self.response_ewma.values()) / len(self.response_ewma), 1.0)
+        return DEFAULT_RESPONSE_SECONDS
+
+    def pick(self, candidates: Iterable[int], active: Dict[int, int]) -> Optional[int]:
+        best: list[int] = []
+        best_score = 0.0
+        for admin_id in candidates:
+            score = (active.get(admin_id, 0) + 1) * self.expected_response(admin_id)
+            if not best or score < best_score:
+                best, best_score = [admin_id], score
+            elif score == best_score:
+                best.append(admin_id)
+        return random.choice(best) if best else None
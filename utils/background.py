@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Coroutine, Set
+
+log = logging.getLogger(__name__)
+
+
+class TaskSet:
+    """Tarefas em segundo plano de um componente (cog, scheduler, writer).
+
+    O event loop só guarda referência fraca das tasks de `asyncio.create_task`:
+    uma task sem dono pode ser coletada no meio e a exceção dela some. Aqui cada
+    task fica no set até terminar e, se falhar, vai para o log com `name`.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._tasks: Set[asyncio.Task] = set()
+
+    def spawn(self, coro: Coroutine[Any, Any, Any]) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._done)
+        return task
+
+    def _done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            log.error("Tarefa em segundo plano de %s falhou", self.name, exc_info=task.exception())
+
+    def cancel_all(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+
+    def __len__(self) -> int:
+        return len(self._tasks)
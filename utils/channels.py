@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Optional, Set
+
+import discord
+
+
+def configured_channel_ids(cfg: Dict[str, Any]) -> Set[int]:
+    """Todos os ids de canal/categoria citados no config.json (chaves `*channel*_id` / `*category*_id`)."""
+    out: Set[int] = set()
+
+    def walk(node: Any) -> None:
+        if isinstance(node, dict):
+            for k, v in node.items():
+                key = str(k)
+                if key.endswith("_id") and ("channel" in key or "category" in key) and "message" not in key:
+                    try:
+                        if int(v):
+                            out.add(int(v))
+                    except (TypeError, ValueError):
+                        pass
+                else:
+                    walk(v)
+
+    walk(cfg)
+    return out
+
+
+class ChannelRegistry:
+    """Canais já resolvidos, servidos sem chamada REST.
+
+    É preenchido a partir do cache do gateway quando a guild fica disponível e
+    mantido em dia pelos eventos de update/delete de canal. `fetch_channel`
+    só é usado como último recurso, para um id que o cache não conhece.
+    """
+
+    def __init__(self):
+        self._channels: Dict[int, Any] = {}
+
+    def prime(self, guild: discord.Guild, cfg: Dict[str, Any]) -> int:
+        found = 0
+        for channel_id in configured_channel_ids(cfg):
+            ch = guild.get_channel_or_thread(channel_id)
+            if ch is not None:
+                self._channels[channel_id] = ch
+                found += 1
+        return found
+
+    def get(self, guild: discord.Guild, channel_id: int) -> Optional[Any]:
+        channel_id = int(channel_id)
+        ch = self._channels.get(channel_id)
+        if ch is None:
+            ch = guild.get_channel_or_thread(channel_id)
+            if ch is not None:
+                self._channels[channel_id] = ch
+        return ch
+
+    async def resolve(self, guild: discord.Guild, channel_id: int) -> Any:
+        """Como `guild.fetch_channel`, mas só vai ao REST se o canal não estiver em cache."""
+        ch = self.get(guild, channel_id)
+        if ch is None:
+            ch = await guild.fetch_channel(int(channel_id))
+            self._channels[int(channel_id)] = ch
+        return ch
+
+    # ----------
+    # Eventos do gateway
+    # ----------
+    async def on_guild_channel_update(self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel):
+        if after.id in self._channels:
+            self._channels[after.id] = after
+
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
+        self._channels.pop(channel.id, None)
+
+    async def on_thread_delete(self, thread: discord.Thread):
+        self._channels.pop(thread.id, None)
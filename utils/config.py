@@ -1,17 +1,152 @@
-
+import asyncio
 import json
 import os
-from typing import Dict, Any
+import tempfile
+import threading
+from typing import Dict, Any, List, Optional
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 CONFIG_PATH = os.path.join(BASE_DIR, "config.json")
+# Arquivos locais gerados pelo bot (espelhos/caches). Não versionar.
+DATA_DIR = os.path.join(BASE_DIR, "data")
+
+# Janela em que vários save_config() seguidos viram uma única escrita.
+SAVE_COALESCE_SECONDS = 0.5
+
+
+def write_atomic(path: str, text: str, prefix: str = ".tmp-") -> None:
+    """Grava `text` em `path` via arquivo temporário + fsync + rename: quem lê
+    vê o arquivo antigo inteiro ou o novo inteiro, nunca pela metade."""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=prefix, dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+class ConfigStore:
+    """config.json em memória.
+
+    - `get()` devolve o dict já parseado e só relê o arquivo quando o mtime muda
+      (edição manual com o bot rodando continua funcionando).
+    - `save()` atualiza a memória na hora e agenda a escrita: saves próximos são
+      agrupados e gravados fora do event loop com arquivo temporário + rename,
+      então o config.json nunca fica pela metade.
+    """
+
+    def __init__(self, path: str = CONFIG_PATH):
+        self.path = path
+        self._cfg: Optional[Dict[str, Any]] = None
+        self._mtime: float = 0.0
+        self._dirty = False
+        self._flush_task: Optional[asyncio.Task] = None
+        self._write_lock = threading.Lock()
+
+    def get(self) -> Dict[str, Any]:
+        if self._dirty and self._cfg is not None:
+            # tem escrita pendente: a memória é mais nova que o disco
+            return self._cfg
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            raise FileNotFoundError(f"config.json não encontrado em: {self.path}")
+        if self._cfg is None or mtime != self._mtime:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._cfg = json.load(f)
+            self._mtime = mtime
+        return self._cfg
+
+    def save(self, cfg: Dict[str, Any]) -> None:
+        self._cfg = cfg
+        self._dirty = True
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # fora do event loop (scripts/startup): grava direto
+            self._write(self._dump())
+            return
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = loop.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self) -> None:
+        await asyncio.sleep(SAVE_COALESCE_SECONDS)
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Grava agora o que estiver pendente (chamado também no shutdown)."""
+        while self._dirty:
+            data = self._dump()
+            await asyncio.to_thread(self._write, data)
+
+    def _dump(self) -> str:
+        # serializa no loop (snapshot consistente); só o I/O vai para a thread
+        self._dirty = False
+        return json.dumps(self._cfg, indent=2, ensure_ascii=False)
+
+    def _write(self, data: str) -> None:
+        with self._write_lock:
+            write_atomic(self.path, data, prefix=".config-")
+            self._mtime = os.stat(self.path).st_mtime
+
+
+store = ConfigStore()
+
 
 def load_config() -> Dict[str, Any]:
-    if not os.path.exists(CONFIG_PATH):
-        raise FileNotFoundError(f"config.json não encontrado em: {CONFIG_PATH}")
-    with open(CONFIG_PATH, "r", encoding="utf-8") as f:
-        return json.load(f)
+    """Config em cache. O dict é compartilhado: só altere se for chamar save_config em seguida."""
+    return store.get()
+
 
 def save_config(cfg: Dict[str, Any]) -> None:
-    with open(CONFIG_PATH, "w", encoding="utf-8") as f:
-        json.dump(cfg, f, indent=2, ensure_ascii=False)
+    store.save(cfg)
+
+
+async def flush_config() -> None:
+    await store.flush()
+
+
+# =====================
+# Acessores tipados
+# =====================
+def get_section(name: str) -> Dict[str, Any]:
+    sec = store.get().get(name, {})
+    return sec if isinstance(sec, dict) else {}
+
+
+def get_int(section: str, key: str, default: int = 0) -> int:
+    try:
+        return int(get_section(section).get(key, default) or default)
+    except (TypeError, ValueError):
+        return default
+
+
+def get_int_list(section: str, key: str) -> List[int]:
+    out: List[int] = []
+    for v in get_section(section).get(key, []) or []:
+        try:
+            out.append(int(v))
+        except (TypeError, ValueError):
+            continue
+    return out
+
+
+def get_bool(section: str, key: str, default: bool = False) -> bool:
+    v = get_section(section).get(key, default)
+    return v if isinstance(v, bool) else default
+
+
+def get_float(section: str, key: str, default: float = 0.0) -> float:
+    try:
+        return float(get_section(section).get(key, default))
+    except (TypeError, ValueError):
+        return default
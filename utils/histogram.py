@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# cada bucket cobre um fator de 1.25 (erro relativo máximo ~12%); 1s .. ~1 ano cabe em ~75 buckets
+LOG_BASE = 1.25
+MAX_BUCKET = 80
+
+
+class LogHistogram:
+    """Histograma em streaming com buckets logarítmicos.
+
+    Memória limitada (no máximo MAX_BUCKET + 1 contadores) qualquer que seja o
+    número de amostras; quantis saem com erro relativo de no máximo metade de um bucket.
+    Valores em segundos; tudo abaixo de 1s cai no bucket 0.
+    """
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    @staticmethod
+    def _bucket(value: float) -> int:
+        if value < 1.0:
+            return 0
+        return min(int(math.log(value, LOG_BASE)) + 1, MAX_BUCKET)
+
+    @staticmethod
+    def _bucket_mid(bucket: int) -> float:
+        if bucket == 0:
+            return 0.5
+        lo = LOG_BASE ** (bucket - 1)
+        return lo * (1 + LOG_BASE) / 2
+
+    def add(self, value: float) -> None:
+        value = max(float(value), 0.0)
+        b = self._bucket(value)
+        self.counts[b] = self.counts.get(b, 0) + 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def merge(self, other: "LogHistogram") -> None:
+        for b, n in other.counts.items():
+            self.counts[b] = self.counts.get(b, 0) + n
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for b in sorted(self.counts):
+            seen += self.counts[b]
+            if seen >= rank:
+                return min(self._bucket_mid(b), self.max)
+        return self.max
+
+    def dump(self) -> dict:
+        return {"c": {str(b): n for b, n in self.counts.items()}, "n": self.count, "t": self.total, "m": self.max}
+
+    @classmethod
+    def load(cls, data: dict) -> "LogHistogram":
+        h = cls()
+        h.counts = {int(b): int(n) for b, n in (data.get("c") or {}).items()}
+        h.count = int(data.get("n", 0))
+        h.total = float(data.get("t", 0.0))
+        h.max = float(data.get("m", 0.0))
+        return h
+
+
+class HistogramSet:
+    """Histogramas nomeados por (grupo, chave, métrica), ex.: ("tipo", "duvidas", "resolucao")."""
+
+    def __init__(self):
+        self.hists: Dict[Tuple[str, str, str], LogHistogram] = {}
+
+    def add(self, group: str, key: str, metric: str, value: float) -> None:
+        k = (group, str(key), metric)
+        h = self.hists.get(k)
+        if h is None:
+            h = self.hists[k] = LogHistogram()
+        h.add(value)
+
+    def get(self, group: str, key: str, metric: str) -> Optional[LogHistogram]:
+        return self.hists.get((group, str(key), metric))
+
+    def keys(self, group: str) -> List[str]:
+        return sorted({k for g, k, _ in self.hists if g == group})
+
+    def total(self, group: str, metric: str, keys: Optional[Iterable[str]] = None) -> LogHistogram:
+        """Soma dos histogramas de um grupo para uma métrica."""
+        out = LogHistogram()
+        wanted = set(keys) if keys is not None else None
+        for (g, k, m), h in self.hists.items():
+            if g == group and m == metric and (wanted is None or k in wanted):
+                out.merge(h)
+        return out
+
+    def dump(self) -> dict:
+        return {"|".join(k): h.dump() for k, h in self.hists.items()}
+
+    @classmethod
+    def load(cls, data: dict) -> "HistogramSet":
+        hs = cls()
+        for key, h in (data or {}).items():
+            parts = key.split("|")
+            if len(parts) == 3:
+                hs.hists[(parts[0], parts[1], parts[2])] = LogHistogram.load(h)
+        return hs
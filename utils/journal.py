@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import copy
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+from utils.config import DATA_DIR, write_atomic
+
+JOURNAL_PATH = os.path.join(DATA_DIR, "prisao_journal.jsonl")
+# com entradas pendentes, o arquivo só é reescrito depois de crescer até aqui
+COMPACT_MIN_LINES = 1000
+
+
+class SubmissionJournal:
+    """Diário local (write-ahead) dos registros de prisão ainda não replicados no Discord.
+
+    Uma linha JSON por evento, gravada com fsync antes de retornar:
+    - {"op": "submit", "id": ..., "data": {...}}   registro novo
+    - {"op": "step", "id": ..., "step": "db", "value": ...}   etapa concluída
+    - {"op": "done", "id": ...}   tudo replicado
+    Ao abrir, o arquivo é relido e o que não tem "done" volta a ficar pendente.
+    Uma última linha cortada (queda no meio da escrita) é ignorada.
+    Os métodos são síncronos: chame via `asyncio.to_thread`.
+    """
+
+    def __init__(self, path: str = JOURNAL_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._pending: Dict[int, Dict[str, Any]] = {}
+        self._lines = 0
+        self._load()
+        self._fh = open(self.path, "a", encoding="utf-8")
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, "rb") as f:
+                raw = f.read()
+        except FileNotFoundError:
+            return
+        end = raw.rfind(b"\n") + 1
+        if end < len(raw):
+            # linha cortada no fim: descarta, senão a próxima escrita emendaria nela
+            with open(self.path, "r+b") as f:
+                f.truncate(end)
+                f.flush()
+                os.fsync(f.fileno())
+        for line in raw[:end].splitlines():
+            try:
+                self._apply(json.loads(line))
+                self._lines += 1
+            except Exception:
+                continue
+
+    def _apply(self, ev: Dict[str, Any]) -> None:
+        rec_id = int(ev["id"])
+        op = ev.get("op")
+        if op == "submit":
+            self._pending[rec_id] = {"id": rec_id, "data": ev.get("data") or {}, "steps": {}}
+        elif op == "step":
+            entry = self._pending.get(rec_id)
+            if entry is not None:
+                entry["steps"][ev["step"]] = ev.get("value")
+        elif op == "done":
+            self._pending.pop(rec_id, None)
+
+    def _append(self, ev: Dict[str, Any]) -> None:
+        with self._lock:
+            self._fh.write(json.dumps(ev, ensure_ascii=False, separators=(",", ":")) + "\n")
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+            self._apply(ev)
+            self._lines += 1
+
+    # ----------
+    # API
+    # ----------
+    def submit(self, rec_id: int, data: Dict[str, Any]) -> None:
+        self._append({"op": "submit", "id": rec_id, "data": data})
+
+    def mark(self, rec_id: int, step: str, value: Any = None) -> None:
+        self._append({"op": "step", "id": rec_id, "step": step, "value": value})
+
+    def done(self, rec_id: int) -> None:
+        self._append({"op": "done", "id": rec_id})
+
+    def pending(self) -> List[Dict[str, Any]]:
+        """Entradas não concluídas, na ordem de chegada (cópias)."""
+        with self._lock:
+            return copy.deepcopy(list(self._pending.values()))
+
+    def get(self, rec_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            e = self._pending.get(rec_id)
+            return copy.deepcopy(e) if e else None
+
+    def compact(self) -> None:
+        """Reescreve o arquivo só com as entradas pendentes (temp + rename).
+
+        Sem pendências o arquivo é zerado; com pendências, só depois de COMPACT_MIN_LINES.
+        """
+        with self._lock:
+            if self._lines <= len(self._pending):
+                return
+            if self._pending and self._lines < COMPACT_MIN_LINES:
+                return
+            lines = []
+            for e in self._pending.values():
+                lines.append(json.dumps({"op": "submit", "id": e["id"], "data": e["data"]}, ensure_ascii=False, separators=(",", ":")))
+                for step, value in e["steps"].items():
+                    lines.append(json.dumps({"op": "step", "id": e["id"], "step": step, "value": value}, ensure_ascii=False, separators=(",", ":")))
+            self._fh.close()
+            write_atomic(self.path, "".join(line + "\n" for line in lines), prefix=".journal-")
+            self._fh = open(self.path, "a", encoding="utf-8")
+            self._lines = len(lines)
+
+    def close(self) -> None:
+        try:
+            self._fh.close()
+        except Exception:
+            pass
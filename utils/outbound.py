@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+import aiohttp
+import discord
+
+log = logging.getLogger(__name__)
+
+# classes de prioridade (menor = antes)
+PRIORITY_INTERACTIVE = 0   # escrita que um ADM está esperando (ex.: "Atualizar agora" do ranking)
+PRIORITY_NORMAL = 1        # logs e avisos (canal ADM, registro)
+PRIORITY_BACKGROUND = 2    # cosmético (edição do ranking)
+
+# chamadas REST em voo ao mesmo tempo, somando todas as rotas
+MAX_INFLIGHT = 8
+
+# tentativas de uma etapa isolada (with_retries) e espera base entre elas
+RETRY_ATTEMPTS = 3
+RETRY_BASE_DELAY = 0.5
+
+Factory = Callable[[], Awaitable[Any]]
+
+
+class _Job:
+    __slots__ = ("priority", "seq", "factory", "key", "futures")
+
+    def __init__(self, priority: int, seq: int, factory: Factory, key: Optional[Hashable]):
+        self.priority = priority
+        self.seq = seq
+        self.factory = factory
+        self.key = key
+        self.futures: List[asyncio.Future] = []
+
+    def __lt__(self, other: "_Job") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class _Route:
+    __slots__ = ("heap", "pending", "task")
+
+    def __init__(self):
+        self.heap: List[_Job] = []
+        self.pending: Dict[Hashable, _Job] = {}
+        self.task: Optional[asyncio.Task] = None
+
+
+class _PrioritySlots:
+    """Semáforo em que, havendo fila, a vaga liberada vai para a menor prioridade."""
+
+    def __init__(self, size: int):
+        self._free = size
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+
+    async def acquire(self, priority: int) -> None:
+        if self._free > 0 and not self._waiters:
+            self._free -= 1
+            return
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), fut))
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # a vaga já tinha sido entregue: devolve
+                self.release()
+            raise
+
+    def release(self) -> None:
+        while self._waiters:
+            _, _, fut = heapq.heappop(self._waiters)
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self._free += 1
+
+
+class OutboundDispatcher:
+    """Fila central de escritas na API do Discord (send/edit/pin/delete).
+
+    - Uma fila por rota (em geral o id do canal, que é o bucket de rate limit do
+      Discord), processada em ordem de prioridade e depois de chegada.
+    - Um limite global de chamadas em voo que atende primeiro o trabalho interativo.
+    - Edições pendentes com a mesma `key` (ex.: ("edit", message_id)) são fundidas:
+      só a mais recente vai para a API e todos os chamadores recebem o resultado dela.
+    - O cliente do discord.py espera os 429 dentro da própria chamada; como cada rota
+      tem seu próprio worker, um canal limitado só atrasa a própria fila.
+
+    Respostas de interação (followup, modal) não passam por aqui: usam o token da
+    interação, que tem limite próprio e não disputa com estas rotas.
+    """
+
+    def __init__(self, max_inflight: int = MAX_INFLIGHT):
+        self._routes: Dict[Hashable, _Route] = {}
+        self._slots = _PrioritySlots(max_inflight)
+        self._seq = itertools.count()
+
+    # ----------
+    # API
+    # ----------
+    def submit(self, route: Hashable, factory: Factory, *, priority: int = PRIORITY_NORMAL, key: Optional[Hashable] = None) -> asyncio.Future:
+        """Agenda `factory()` na rota; o future resolve com o retorno da chamada."""
+        fut = asyncio.get_running_loop().create_future()
+        r = self._routes.get(route)
+        if r is None:
+            r = self._routes[route] = _Route()
+
+        job = r.pending.get(key) if key is not None else None
+        if job is not None:
+            # ainda não saiu: troca pela versão mais nova
+            job.factory = factory
+            job.futures.append(fut)
+            if priority < job.priority:
+                job.priority = priority
+                heapq.heapify(r.heap)
+            return fut
+
+        job = _Job(priority, next(self._seq), factory, key)
+        job.futures.append(fut)
+        heapq.heappush(r.heap, job)
+        if key is not None:
+            r.pending[key] = job
+        if r.task is None or r.task.done():
+            r.task = asyncio.create_task(self._run(route, r))
+        return fut
+
+    def post(self, route: Hashable, factory: Factory, *, priority: int = PRIORITY_NORMAL, key: Optional[Hashable] = None) -> None:
+        """Como `submit`, sem esperar: falhas só vão para o log."""
+        fut = self.submit(route, factory, priority=priority, key=key)
+        fut.add_done_callback(_log_failure)
+
+    def send(self, channel: discord.abc.Messageable, *, priority: int = PRIORITY_NORMAL, **kwargs: Any) -> asyncio.Future:
+        return self.submit(getattr(channel, "id", channel), lambda: channel.send(**kwargs), priority=priority)
+
+    def edit(self, message: discord.Message | discord.PartialMessage, *, priority: int = PRIORITY_BACKGROUND, **kwargs: Any) -> asyncio.Future:
+        return self.submit(message.channel.id, lambda: message.edit(**kwargs), priority=priority, key=("edit", message.id))
+
+    def backlog(self) -> int:
+        return sum(len(r.heap) for r in self._routes.values())
+
+    async def drain(self, timeout: float = 10.0) -> None:
+        """Espera as filas esvaziarem (shutdown)."""
+        tasks = [r.task for r in self._routes.values() if r.task is not None and not r.task.done()]
+        if tasks:
+            await asyncio.wait(tasks, timeout=timeout)
+
+    # ----------
+    # Worker por rota
+    # ----------
+    async def _run(self, route: Hashable, r: _Route) -> None:
+        while r.heap:
+            job = heapq.heappop(r.heap)
+            if job.key is not None and r.pending.get(job.key) is job:
+                del r.pending[job.key]
+
+            await self._slots.acquire(job.priority)
+            try:
+                result = await job.factory()
+            except Exception as e:
+                for fut in job.futures:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            finally:
+                self._slots.release()
+            for fut in job.futures:
+                if not fut.done():
+                    fut.set_result(result)
+        self._routes.pop(route, None)
+
+
+async def with_retries(factory: Factory, attempts: int = RETRY_ATTEMPTS, base_delay: float = RETRY_BASE_DELAY) -> Any:
+    """Executa `factory()` repetindo só falhas transitórias (5xx, rede).
+
+    Erros 4xx (Forbidden, NotFound...) sobem na hora: repetir não muda o resultado.
+    Os 429 o discord.py já espera dentro da chamada.
+    """
+    for attempt in range(attempts):
+        last = attempt == attempts - 1
+        try:
+            return await factory()
+        except discord.HTTPException as e:
+            if e.status < 500 or last:
+                raise
+        except (aiohttp.ClientError, OSError, asyncio.TimeoutError):
+            if last:
+                raise
+        await asyncio.sleep(base_delay * (2 ** attempt) + random.uniform(0, base_delay))
+
+
+def _log_failure(fut: asyncio.Future) -> None:
+    if fut.cancelled():
+        return
+    exc = fut.exception()
+    if exc is not None:
+        log.warning("Envio em segundo plano falhou: %s", exc)
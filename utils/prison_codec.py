@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import base64
+import json
+import zlib
+from datetime import timezone
+from typing import Any, Dict, Optional
+
+from utils.timeutils import parse_iso
+
+# Cada linha de registro no DB começa com "<versão><tipo>" seguido de um array JSON
+# posicional. A v1 (objeto JSON com chaves longas) continua sendo lida.
+CODEC_VERSION = "2"
+
+KIND_PRISAO = "p"
+# revogação (tombstone): aponta para o id do registro revogado e leva o `ts` e o
+# policial dele, para o ranking descontar sem precisar achar o registro original
+KIND_REVOGACAO = "r"
+KINDS = {KIND_PRISAO: "prisao", KIND_REVOGACAO: "revogacao"}
+KIND_OF_TYPE = {t: k for k, t in KINDS.items()}
+
+FIELDS = {
+    KIND_PRISAO: ("id", "ts", "officer_id", "preso_id", "preso_nome", "tempo", "multa", "registro_message_id", "registro"),
+    KIND_REVOGACAO: ("id", "ts", "target_id", "target_ts", "officer_id", "admin_id", "motivo"),
+}
+# campos de texto livre, candidatos a compressão
+TEXT_FIELDS = ("registro", "motivo")
+
+# textos longos vão comprimidos (zlib + base85) quando isso realmente encurta a linha
+COMPRESS_MIN_CHARS = 160
+COMPRESSED_PREFIX = "z:"
+
+
+def _json_len(text: str) -> int:
+    """Tamanho do texto já escapado dentro da linha JSON (aspas, barras e quebras de linha crescem)."""
+    return len(json.dumps(text, ensure_ascii=False)) - 2
+
+
+def _pack_text(text: str) -> str:
+    if len(text) < COMPRESS_MIN_CHARS:
+        return text
+    # base85 não tem `"` nem `\`, então o comprimido não cresce ao ser escapado
+    packed = COMPRESSED_PREFIX + base64.b85encode(zlib.compress(text.encode("utf-8"), 9)).decode("ascii")
+    return packed if len(packed) < _json_len(text) else text
+
+
+def _unpack_text(value: Any) -> str:
+    text = str(value or "")
+    if text.startswith(COMPRESSED_PREFIX):
+        try:
+            return zlib.decompress(base64.b85decode(text[len(COMPRESSED_PREFIX):])).decode("utf-8")
+        except Exception:
+            return text
+    return text
+
+
+def epoch_of(value: Any) -> int:
+    """`ts` de um registro como epoch inteiro; aceita o ISO da v1."""
+    if isinstance(value, (int, float)):
+        return int(value)
+    try:
+        dt = parse_iso(str(value))
+    except Exception:
+        return 0
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+def encode_record(rec: Dict[str, Any]) -> str:
+    """Uma linha compacta (v2) para um registro `prisao` ou `revogacao`."""
+    kind = KIND_OF_TYPE.get(rec.get("type") or "prisao", KIND_PRISAO)
+    row = []
+    for field in FIELDS[kind]:
+        v = rec.get(field)
+        if field in ("ts", "target_ts"):
+            v = epoch_of(v)
+        elif field in TEXT_FIELDS:
+            v = _pack_text(str(v or ""))
+        row.append(v)
+    return CODEC_VERSION + kind + json.dumps(row, ensure_ascii=False, separators=(",", ":"))
+
+
+def decode_record(line: str) -> Optional[Dict[str, Any]]:
+    """Decodifica uma linha v2 ou um objeto JSON v1. `ts` sai sempre como epoch inteiro."""
+    line = (line or "").strip()
+    if not line:
+        return None
+    if line.startswith("{"):
+        try:
+            rec = json.loads(line)
+        except Exception:
+            return None
+        if not isinstance(rec, dict):
+            return None
+        rec["ts"] = epoch_of(rec.get("ts"))
+        return rec
+
+    if len(line) < 3 or line[0] != CODEC_VERSION or line[1] not in FIELDS:
+        return None
+    kind = line[1]
+    try:
+        row = json.loads(line[2:])
+    except Exception:
+        return None
+    if not isinstance(row, list):
+        return None
+    rec: Dict[str, Any] = {"type": KINDS[kind]}
+    for field, v in zip(FIELDS[kind], row):
+        rec[field] = v
+    for field in TEXT_FIELDS:
+        if field in rec:
+            rec[field] = _unpack_text(rec[field])
+    rec["ts"] = epoch_of(rec.get("ts"))
+    return rec
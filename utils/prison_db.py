@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from utils.config import DATA_DIR
+from utils.prison_codec import epoch_of
+
+DB_PATH = os.path.join(DATA_DIR, "prisao.sqlite3")
+
+# Sobe quando o layout das tabelas muda: o espelho é só cache, então é
+# descartado e reconstruído a partir do canal de DB.
+SCHEMA_VERSION = 3
+
+TYPE_PRISAO = "prisao"
+TYPE_REVOGACAO = "revogacao"
+# tipos de linha do DB que o espelho acompanha
+MIRROR_TYPES = (TYPE_PRISAO, TYPE_REVOGACAO)
+
+# registro ainda valendo: sem revogação (tombstone) apontando para ele
+_LIVE = "rec_id NOT IN (SELECT target_id FROM tombstones)"
+
+
+def record_id(rec: dict, db_msg_id: int) -> int:
+    """Id estável do registro. Registros antigos (um por mensagem) usam o id da mensagem do DB."""
+    try:
+        return int(rec.get("id") or db_msg_id)
+    except (TypeError, ValueError):
+        return int(db_msg_id)
+
+
+def record_epoch(rec: dict) -> float:
+    """Timestamp do registro em epoch (UTC). Registros sem `ts` válido viram 0."""
+    return float(epoch_of(rec.get("ts")))
+
+
+class PrisonMirror:
+    """Espelho local (SQLite) dos registros `prisao` (e das revogações) do canal de DB.
+
+    O canal continua sendo a fonte da verdade; aqui guardamos só o que já foi
+    lido e o último message id visto, para que a sincronização busque apenas
+    as mensagens novas. Uma mensagem do DB pode conter vários registros (modo
+    packed), por isso a chave é o id do registro e não o da mensagem.
+
+    O DB só cresce: revogar é anexar um tombstone (`revogacao`) com o id do
+    registro. Os dois ficam no espelho e as leituras escondem os revogados, em
+    qualquer ordem de chegada (o backfill lê do mais novo para o mais antigo).
+
+    As escritas são do event loop. `columns_between` usa uma conexão própria e
+    pode rodar via `asyncio.to_thread`; `version` sobe a cada escrita para que o
+    chamador saiba o que a leitura já viu.
+    """
+
+    def __init__(self, path: str = DB_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._ensure_schema()
+        self.version = 0
+        self._write_lock = threading.Lock()
+        self._read_lock = threading.Lock()
+        self._reader: Optional[sqlite3.Connection] = None
+
+    def close(self) -> None:
+        try:
+            self.conn.close()
+            if self._reader is not None:
+                self._reader.close()
+        except Exception:
+            pass
+
+    # ----------
+    # Schema / meta
+    # ----------
+    def _ensure_schema(self) -> None:
+        c = self.conn
+        c.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        row = c.execute("SELECT value FROM meta WHERE key = 'schema'").fetchone()
+        if row is None or int(row["value"]) != SCHEMA_VERSION:
+            c.execute("DROP TABLE IF EXISTS records")
+            c.execute("DROP TABLE IF EXISTS tombstones")
+            c.execute("DELETE FROM meta")
+        c.execute(
+            "CREATE TABLE IF NOT EXISTS records ("
+            " rec_id INTEGER PRIMARY KEY,"
+            " db_msg_id INTEGER NOT NULL,"
+            " ts REAL NOT NULL,"
+            " officer_id INTEGER NOT NULL,"
+            " tempo INTEGER NOT NULL,"
+            " multa INTEGER NOT NULL,"
+            " data TEXT NOT NULL)"
+        )
+        c.execute("CREATE INDEX IF NOT EXISTS records_ts ON records (ts)")
+        c.execute("CREATE INDEX IF NOT EXISTS records_msg ON records (db_msg_id)")
+        c.execute(
+            "CREATE TABLE IF NOT EXISTS tombstones ("
+            " target_id INTEGER PRIMARY KEY,"
+            " rec_id INTEGER NOT NULL,"
+            " db_msg_id INTEGER NOT NULL,"
+            " target_ts REAL NOT NULL,"
+            " officer_id INTEGER NOT NULL,"
+            " data TEXT NOT NULL)"
+        )
+        c.execute("CREATE INDEX IF NOT EXISTS tombstones_msg ON tombstones (db_msg_id)")
+        self._set_meta("schema", str(SCHEMA_VERSION))
+        c.commit()
+
+    def _get_meta(self, key: str, default: str = "") -> str:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else default
+
+    def _set_meta(self, key: str, value: str) -> None:
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    @property
+    def channel_id(self) -> int:
+        return int(self._get_meta("channel_id", "0"))
+
+    @property
+    def last_msg_id(self) -> int:
+        return int(self._get_meta("last_msg_id", "0"))
+
+    @property
+    def backfill_before(self) -> int:
+        """Diferente de 0 enquanto faltam no espelho as mensagens mais antigas que este id
+        (cold start a partir de um checkpoint). Espelho incompleto não serve para relatórios."""
+        return int(self._get_meta("backfill_before", "0"))
+
+    def set_backfill_before(self, msg_id: int) -> None:
+        with self.conn:
+            self._set_meta("backfill_before", str(int(msg_id)))
+
+    def reset(self, channel_id: int) -> None:
+        """Zera o espelho (ex.: canal de DB trocado no config.json)."""
+        with self._write_lock:
+            self.conn.execute("DELETE FROM records")
+            self.conn.execute("DELETE FROM tombstones")
+            self.conn.execute("DELETE FROM meta WHERE key != 'schema'")
+            self._set_meta("channel_id", str(int(channel_id)))
+            self.conn.commit()
+            self.version += 1
+
+    # ----------
+    # Escrita
+    # ----------
+    def apply(self, rows: Iterable[Tuple[int, dict]], last_msg_id: int = 0) -> List[Tuple[float, int, int]]:
+        """Grava (db_msg_id, registro ou revogação) numa única transação e avança o cursor.
+
+        Retorna o efeito no ranking, (ts, officer_id, delta), só do que ainda não
+        estava no espelho: +1 por registro novo e válido, -1 por revogação nova.
+        Assim quem mantém agregados incrementais não conta nada duas vezes.
+        """
+        changes: List[Tuple[float, int, int]] = []
+        with self._write_lock, self.conn:
+            self.version += 1
+            for msg_id, rec in rows:
+                if rec.get("type") == TYPE_REVOGACAO:
+                    cur = self.conn.execute(
+                        "INSERT OR IGNORE INTO tombstones (target_id, rec_id, db_msg_id, target_ts, officer_id, data) VALUES (?, ?, ?, ?, ?, ?)",
+                        (
+                            as_int(rec.get("target_id")),
+                            record_id(rec, msg_id),
+                            int(msg_id),
+                            float(epoch_of(rec.get("target_ts"))),
+                            as_int(rec.get("officer_id")),
+                            json.dumps(rec, ensure_ascii=False),
+                        ),
+                    )
+                    if cur.rowcount:
+                        changes.append((float(epoch_of(rec.get("target_ts"))), as_int(rec.get("officer_id")), -1))
+                    continue
+
+                rid = record_id(rec, msg_id)
+                cur = self.conn.execute(
+                    "INSERT OR IGNORE INTO records (rec_id, db_msg_id, ts, officer_id, tempo, multa, data) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        rid,
+                        int(msg_id),
+                        record_epoch(rec),
+                        as_int(rec.get("officer_id")),
+                        as_int(rec.get("tempo")),
+                        as_int(rec.get("multa")),
+                        json.dumps(rec, ensure_ascii=False),
+                    ),
+                )
+                if cur.rowcount and not self.is_revoked(rid):
+                    changes.append((record_epoch(rec), as_int(rec.get("officer_id")), 1))
+            if last_msg_id > self.last_msg_id:
+                self._set_meta("last_msg_id", str(int(last_msg_id)))
+        return changes
+
+    def remove_messages(self, msg_ids: Iterable[int]) -> List[Tuple[float, int, int]]:
+        """Esquece o conteúdo de mensagens do DB apagadas à mão; devolve o efeito no ranking.
+
+        Tombstones saem primeiro (o registro volta a valer, +1) e depois os registros
+        (os que valiam, -1), então apagar registro e revogação juntos dá zero.
+        """
+        changes: List[Tuple[float, int, int]] = []
+        ids = [int(i) for i in msg_ids]
+        with self._write_lock, self.conn:
+            self.version += 1
+            for i in ids:
+                for r in self.conn.execute("SELECT target_ts, officer_id FROM tombstones WHERE db_msg_id = ?", (i,)).fetchall():
+                    changes.append((float(r["target_ts"]), int(r["officer_id"]), 1))
+                self.conn.execute("DELETE FROM tombstones WHERE db_msg_id = ?", (i,))
+            for i in ids:
+                for r in self.conn.execute(f"SELECT ts, officer_id FROM records WHERE db_msg_id = ? AND {_LIVE}", (i,)).fetchall():
+                    changes.append((float(r["ts"]), int(r["officer_id"]), -1))
+                self.conn.execute("DELETE FROM records WHERE db_msg_id = ?", (i,))
+        return changes
+
+    # ----------
+    # Leitura
+    # ----------
+    def is_revoked(self, rec_id: int) -> bool:
+        return self.conn.execute("SELECT 1 FROM tombstones WHERE target_id = ?", (int(rec_id),)).fetchone() is not None
+
+    def get(self, rec_id: int) -> Optional[dict]:
+        """Registro pelo id, mesmo revogado (aí com `_revoked` = True)."""
+        row = self.conn.execute("SELECT rec_id, db_msg_id, data FROM records WHERE rec_id = ?", (int(rec_id),)).fetchone()
+        if not row:
+            return None
+        rec = _row_to_record(row)
+        rec["_revoked"] = self.is_revoked(rec["id"])
+        return rec
+
+    def columns_between(self, ini: datetime, end: Optional[datetime] = None) -> Tuple[int, List[Tuple[float, int, int, int]]]:
+        """(version, linhas): (ts, officer_id, tempo, multa) dos registros válidos em ordem
+        cronológica, sem decodificar o JSON, e a `version` do espelho que a leitura reflete.
+
+        Alimenta o utils.rank_engine (ranking e relatórios). Feito para `asyncio.to_thread`.
+        """
+        if end is None:
+            sql = f"SELECT ts, officer_id, tempo, multa FROM records WHERE ts >= ? AND {_LIVE} ORDER BY ts"
+            params: Tuple[float, ...] = (ini.timestamp(),)
+        else:
+            sql = f"SELECT ts, officer_id, tempo, multa FROM records WHERE ts >= ? AND ts < ? AND {_LIVE} ORDER BY ts"
+            params = (ini.timestamp(), end.timestamp())
+        with self._read_lock:
+            if self._reader is None:
+                self._reader = sqlite3.connect(self.path, check_same_thread=False)
+            r = self._reader
+            r.execute("BEGIN")
+            try:
+                # o primeiro passo do SELECT fixa o snapshot (WAL); com as escritas
+                # travadas nesse instante, `version` diz exatamente o que ele contém
+                with self._write_lock:
+                    cur = r.execute(sql, params)
+                    first = cur.fetchmany(1)
+                    version = self.version
+                rows = first + cur.fetchall()
+            finally:
+                r.execute("COMMIT")
+        return version, [tuple(row) for row in rows]
+
+    def changes_after_msg(self, db_msg_id: int) -> List[Tuple[float, int, int]]:
+        """Efeito no ranking, (ts, officer_id, delta), das mensagens posteriores a `db_msg_id`:
+        +1 por registro (revogado ou não) e -1 por revogação."""
+        out = [
+            (float(r["ts"]), int(r["officer_id"]), 1)
+            for r in self.conn.execute("SELECT ts, officer_id FROM records WHERE db_msg_id > ?", (int(db_msg_id),))
+        ]
+        out.extend(
+            (float(r["target_ts"]), int(r["officer_id"]), -1)
+            for r in self.conn.execute("SELECT target_ts, officer_id FROM tombstones WHERE db_msg_id > ?", (int(db_msg_id),))
+        )
+        return out
+
+    def count(self) -> int:
+        return int(self.conn.execute(f"SELECT COUNT(*) FROM records WHERE {_LIVE}").fetchone()[0])
+
+
+def as_int(v: Any) -> int:
+    try:
+        return int(v or 0)
+    except Exception:
+        return 0
+
+
+def _row_to_record(row: sqlite3.Row) -> Dict[str, Any]:
+    rec = json.loads(row["data"])
+    rec["id"] = int(row["rec_id"])
+    rec["_db_msg_id"] = int(row["db_msg_id"])
+    return rec
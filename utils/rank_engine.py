@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from utils.prison_db import as_int
+
+# colunas de cada linha em `RecordArrays.from_rows`
+COLUMNS = ("ts", "officer_id", "tempo", "multa")
+
+
+class RecordArrays:
+    """Registros de prisão em colunas int64 (ts epoch, officer_id, tempo, multa).
+
+    Agregações (contagem por policial, somas, buckets do ranking) viram máscaras
+    e `np.unique` em vez de um loop Python por registro.
+    """
+
+    __slots__ = ("ts", "officer", "tempo", "multa")
+
+    def __init__(self, ts: np.ndarray, officer: np.ndarray, tempo: np.ndarray, multa: np.ndarray):
+        self.ts = ts
+        self.officer = officer
+        self.tempo = tempo
+        self.multa = multa
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Tuple[float, int, int, int]]) -> "RecordArrays":
+        """Linhas (ts, officer_id, tempo, multa), ex.: direto de um SELECT do espelho."""
+        data = np.array(rows, dtype=np.int64).reshape(-1, len(COLUMNS))
+        return cls(data[:, 0], data[:, 1], data[:, 2], data[:, 3])
+
+    @classmethod
+    def from_records(cls, records: Iterable[dict]) -> "RecordArrays":
+        """Registros já decodificados (caminho de fallback, lido do canal)."""
+        return cls.from_rows([
+            (as_int(r.get("ts")), as_int(r.get("officer_id")), as_int(r.get("tempo")), as_int(r.get("multa")))
+            for r in records
+        ])
+
+    def __len__(self) -> int:
+        return int(self.ts.shape[0])
+
+
+def officer_counts(officer: np.ndarray) -> Dict[int, int]:
+    """Prisões por policial (officer_id 0 = desconhecido, fica de fora)."""
+    ids, counts = np.unique(officer[officer != 0], return_counts=True)
+    return dict(zip(ids.tolist(), counts.tolist()))
+
+
+def top_officers(officer: np.ndarray, n: int) -> List[Tuple[int, int]]:
+    """Os `n` policiais com mais prisões. Empate: quem aparece primeiro nos registros
+    (que chegam em ordem cronológica), como no ranking por dict de antes."""
+    ids, first, counts = np.unique(officer[officer != 0], return_index=True, return_counts=True)
+    order = np.lexsort((first, -counts))[:n]
+    return [(int(ids[i]), int(counts[i])) for i in order]
+
+
+def period_summary(arr: RecordArrays, top_n: int = 15) -> Dict[str, object]:
+    """Total de prisões, soma de tempo e de multa, e o top `top_n` do período."""
+    return {
+        "total": len(arr),
+        "tempo": int(arr.tempo.sum()),
+        "multa": int(arr.multa.sum()),
+        "top": top_officers(arr.officer, top_n),
+    }
+
+
+def bucket_counts(arr: RecordArrays, starts: Dict[str, float]) -> Dict[str, Dict[int, int]]:
+    """Contagem por policial de cada bucket do ranking (registros com ts >= início do bucket)."""
+    return {bucket: officer_counts(arr.officer[arr.ts >= start]) for bucket, start in starts.items()}
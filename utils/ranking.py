@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from utils.timeutils import utcnow, start_of_day, start_of_week, start_of_month, start_of_year
+
+BUCKETS: Dict[str, Callable[[datetime], datetime]] = {
+    "day": start_of_day,
+    "week": start_of_week,
+    "month": start_of_month,
+    "year": start_of_year,
+}
+
+
+class RankCounters:
+    """Contadores de prisões por policial (dia/semana/mês/ano) mantidos em memória.
+
+    Cada bucket guarda o início do período a que se refere; quando o período
+    vira, o bucket é zerado. Assim o ranking custa O(policiais) e a
+    reconstrução completa só acontece no startup.
+    """
+
+    def __init__(self):
+        self.starts: Dict[str, float] = {}
+        self.counts: Dict[str, Dict[int, int]] = {b: {} for b in BUCKETS}
+
+    def roll(self, now: Optional[datetime] = None) -> None:
+        now = now or utcnow()
+        for bucket, start_fn in BUCKETS.items():
+            start = start_fn(now).timestamp()
+            if self.starts.get(bucket) != start:
+                self.starts[bucket] = start
+                self.counts[bucket] = {}
+
+    def add(self, ts: float, officer_id: int, delta: int = 1) -> None:
+        """Soma `delta` (use -1 para revogação) nos buckets que contêm `ts`."""
+        self.roll()
+        self._add(ts, officer_id, delta)
+
+    def _add(self, ts: float, officer_id: int, delta: int) -> None:
+        if not officer_id:
+            return
+        for bucket, start in self.starts.items():
+            if ts < start:
+                continue
+            data = self.counts[bucket]
+            n = data.get(officer_id, 0) + delta
+            if n > 0:
+                data[officer_id] = n
+            else:
+                data.pop(officer_id, None)
+
+    def replace(self, counts: Dict[str, Dict[int, int]], now: Optional[datetime] = None) -> None:
+        """Troca tudo por contagens já agregadas por bucket (ex.: utils.rank_engine)."""
+        self.starts = {}
+        self.roll(now)
+        self.counts = {b: dict(counts.get(b, {}) or {}) for b in BUCKETS}
+
+    def dump(self) -> Dict[str, Any]:
+        """Estado serializável em JSON (usado nos checkpoints do DB)."""
+        return {
+            "starts": dict(self.starts),
+            "counts": {b: {str(k): v for k, v in d.items()} for b, d in self.counts.items()},
+        }
+
+    def load(self, data: Dict[str, Any]) -> None:
+        """Restaura um `dump()`; buckets de períodos que já viraram são descartados."""
+        starts = data.get("starts", {}) or {}
+        counts = data.get("counts", {}) or {}
+        self.starts = {b: float(starts[b]) for b in BUCKETS if b in starts}
+        self.counts = {b: {int(k): int(v) for k, v in (counts.get(b, {}) or {}).items()} for b in BUCKETS}
+        for b in BUCKETS:
+            if b not in self.starts:
+                self.counts[b] = {}
+        self.roll()
+
+    def copy(self) -> "RankCounters":
+        other = RankCounters()
+        other.starts = dict(self.starts)
+        other.counts = {b: dict(d) for b, d in self.counts.items()}
+        return other
+
+    def snapshot(self) -> Dict[str, Dict[int, int]]:
+        self.roll()
+        return {b: dict(d) for b, d in self.counts.items()}
+
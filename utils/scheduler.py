@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from utils.background import TaskSet
+
+log = logging.getLogger(__name__)
+
+
+class DeadlineScheduler:
+    """Dispara `callback(key)` quando o prazo de cada chave vence.
+
+    Um heap ordenado pelo próximo prazo + uma única task que dorme até ele:
+    sem varreduras periódicas e sem atraso de "próximo tick". Re-armar uma
+    chave só empilha a nova entrada; as antigas são descartadas ao chegar no topo.
+    Prazos são epoch (time.time()).
+    """
+
+    def __init__(self, callback: Callable[[Hashable], Awaitable[None]]):
+        self._callback = callback
+        self._heap: List[Tuple[float, int, Hashable]] = []
+        self._current: Dict[Hashable, Tuple[float, int]] = {}
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._tasks = TaskSet("DeadlineScheduler")
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = self._tasks.spawn(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def arm(self, key: Hashable, when: float) -> None:
+        cur = self._current.get(key)
+        if cur is not None and cur[0] == when:
+            return
+        entry = (when, next(self._seq))
+        self._current[key] = entry
+        heapq.heappush(self._heap, (entry[0], entry[1], key))
+        if len(self._heap) > 2 * len(self._current) + 64:
+            self._compact()
+        if self._wakeup is not None and self._heap[0][2] == key:
+            self._wakeup.set()
+
+    def cancel(self, key: Hashable) -> None:
+        self._current.pop(key, None)
+
+    def deadline(self, key: Hashable) -> Optional[float]:
+        cur = self._current.get(key)
+        return cur[0] if cur else None
+
+    def _compact(self) -> None:
+        self._heap = [(when, seq, key) for key, (when, seq) in self._current.items()]
+        heapq.heapify(self._heap)
+
+    def _is_stale(self, item: Tuple[float, int, Hashable]) -> bool:
+        return self._current.get(item[2]) != (item[0], item[1])
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None
+        while True:
+            while self._heap and self._is_stale(self._heap[0]):
+                heapq.heappop(self._heap)
+            if not self._heap:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+
+            delay = self._heap[0][0] - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+
+            when, seq, key = heapq.heappop(self._heap)
+            if self._current.get(key) != (when, seq):
+                continue
+            del self._current[key]
+            # cada disparo roda à parte: um DM lento não atrasa os outros prazos
+            self._tasks.spawn(self._fire(key))
+
+    async def _fire(self, key: Hashable) -> None:
+        try:
+            await self._callback(key)
+        except Exception:
+            log.exception("Falha no callback agendado para %r", key)
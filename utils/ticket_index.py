@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Tuple
+
+from utils.config import DATA_DIR
+
+INDEX_PATH = os.path.join(DATA_DIR, "tickets_fts.sqlite3")
+
+
+def _fts_query(text: str) -> str:
+    """Busca do usuário -> query FTS5 segura: cada palavra vira um termo entre aspas (AND implícito)."""
+    terms = [t.replace('"', '""') for t in text.split() if t.strip()]
+    return " ".join(f'"{t}"' for t in terms)
+
+
+class TicketIndex:
+    """Índice de texto completo (SQLite FTS5) dos transcripts de tickets encerrados.
+
+    As linhas entram em lotes enquanto o transcript é gerado; o ticket só aparece
+    na busca depois de `finish()`, que grava os metadados e o link do upload.
+    Os métodos são síncronos: chame via `asyncio.to_thread`.
+    """
+
+    def __init__(self, path: str = INDEX_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS tickets ("
+            " channel_id INTEGER PRIMARY KEY,"
+            " name TEXT NOT NULL,"
+            " kind TEXT NOT NULL,"
+            " opener_id INTEGER NOT NULL,"
+            " admin_id INTEGER NOT NULL,"
+            " closed_ts REAL NOT NULL,"
+            " motivo TEXT NOT NULL,"
+            " jump_url TEXT NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS lines USING fts5("
+            " content, author UNINDEXED, channel_id UNINDEXED, ts UNINDEXED,"
+            " tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        self.conn.commit()
+
+    def close(self) -> None:
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+
+    def discard(self, channel_id: int) -> None:
+        """Remove o que houver do ticket (ex.: tentativa de encerramento anterior que falhou)."""
+        with self._lock:
+            self.conn.execute("DELETE FROM lines WHERE channel_id = ?", (channel_id,))
+            self.conn.execute("DELETE FROM tickets WHERE channel_id = ?", (channel_id,))
+            self.conn.commit()
+
+    def add_lines(self, channel_id: int, rows: Iterable[Tuple[float, str, str]]) -> None:
+        """`rows` = (ts, autor, conteúdo)."""
+        with self._lock:
+            self.conn.executemany(
+                "INSERT INTO lines (content, author, channel_id, ts) VALUES (?, ?, ?, ?)",
+                [(content, author, channel_id, ts) for ts, author, content in rows if content],
+            )
+            self.conn.commit()
+
+    def finish(self, channel_id: int, name: str, kind: str, opener_id: int, admin_id: int, closed_ts: float, motivo: str, jump_url: str) -> None:
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO tickets (channel_id, name, kind, opener_id, admin_id, closed_ts, motivo, jump_url)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (channel_id, name, kind, opener_id, admin_id, closed_ts, motivo, jump_url),
+            )
+            self.conn.commit()
+
+    def search(self, text: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Tickets com linhas que batem com a busca, do mais relevante ao menos; um trecho por ticket."""
+        query = _fts_query(text)
+        if not query:
+            return []
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT l.channel_id AS channel_id, l.author AS author, l.ts AS ts,"
+                " snippet(lines, 0, '**', '**', '…', 16) AS snip,"
+                " t.name, t.kind, t.opener_id, t.admin_id, t.closed_ts, t.motivo, t.jump_url"
+                " FROM lines l JOIN tickets t ON t.channel_id = l.channel_id"
+                " WHERE lines MATCH ? ORDER BY bm25(lines) LIMIT ?",
+                (query, limit * 20),
+            ).fetchall()
+        out: List[Dict[str, Any]] = []
+        seen = set()
+        for r in rows:
+            if r["channel_id"] in seen:
+                continue
+            seen.add(r["channel_id"])
+            out.append(dict(r))
+            if len(out) >= limit:
+                break
+        return out
+
+    def count(self) -> int:
+        with self._lock:
+            row = self.conn.execute("SELECT COUNT(*) AS n FROM tickets").fetchone()
+        return int(row["n"]) if row else 0
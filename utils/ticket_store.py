@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from utils.config import DATA_DIR, write_atomic
+
+SNAPSHOT_PATH = os.path.join(DATA_DIR, "tickets.json")
+JOURNAL_PATH = os.path.join(DATA_DIR, "tickets.journal")
+
+# depois de tantas linhas no journal, reescreve o snapshot e zera o journal
+COMPACT_AFTER_LINES = 500
+
+
+class TicketStore:
+    """Estado dos tickets abertos (channel_id -> dict) que sobrevive a restart.
+
+    Funciona como um dict em memória. As alterações ficam num buffer (várias
+    mudanças no mesmo ticket viram uma só) e `flush()` as anexa a um journal em
+    disco fora do event loop. No startup, snapshot + journal reconstroem o estado.
+
+    Também guarda a fila de espera (`waiting`: user_id -> tipo, em ordem de
+    chegada), alterada só por `enqueue`/`dequeue`.
+    """
+
+    def __init__(self, snapshot_path: str = SNAPSHOT_PATH, journal_path: str = JOURNAL_PATH):
+        os.makedirs(os.path.dirname(snapshot_path), exist_ok=True)
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path
+        self._state: Dict[int, dict] = {}
+        self._dirty: Dict[int, Optional[dict]] = {}
+        self.waiting: Dict[int, str] = {}
+        # operações da fila desde o último flush, em ordem (a ordem da fila importa)
+        self._queue_ops: List[Tuple[int, Optional[str]]] = []
+        self._journal_lines = 0
+        self._io_lock = threading.Lock()
+        self._flush_lock = asyncio.Lock()
+        self._load()
+
+    # ----------
+    # Interface de dict
+    # ----------
+    def get(self, channel_id: int, default: Any = None) -> Any:
+        return self._state.get(channel_id, default)
+
+    def __contains__(self, channel_id: object) -> bool:
+        return channel_id in self._state
+
+    def __getitem__(self, channel_id: int) -> dict:
+        return self._state[channel_id]
+
+    def __setitem__(self, channel_id: int, state: dict) -> None:
+        self._state[channel_id] = state
+        self._dirty[channel_id] = state
+
+    def __len__(self) -> int:
+        return len(self._state)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._state)
+
+    def items(self) -> List[Tuple[int, dict]]:
+        return list(self._state.items())
+
+    def keys(self) -> List[int]:
+        return list(self._state.keys())
+
+    def pop(self, channel_id: int, default: Any = None) -> Any:
+        if channel_id not in self._state:
+            return default
+        self._dirty[channel_id] = None
+        return self._state.pop(channel_id)
+
+    def touch(self, channel_id: int, **fields: Any) -> None:
+        """Atualização barata de campos (ex.: timestamps do on_message); vai para o disco no próximo flush."""
+        st = self._state.get(channel_id)
+        if st is None:
+            return
+        st.update(fields)
+        self._dirty[channel_id] = st
+
+    # ----------
+    # Fila de espera
+    # ----------
+    def enqueue(self, user_id: int, kind: str) -> None:
+        if user_id in self.waiting:
+            return
+        self.waiting[user_id] = kind
+        self._queue_ops.append((user_id, kind))
+
+    def dequeue(self, user_id: int) -> None:
+        if self.waiting.pop(user_id, None) is not None:
+            self._queue_ops.append((user_id, None))
+
+    def _apply_queue(self, user_id: int, kind: Optional[str]) -> None:
+        self.waiting.pop(user_id, None)
+        if kind is not None:
+            self.waiting[user_id] = kind
+
+    # ----------
+    # Persistência
+    # ----------
+    def _load(self) -> None:
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._state = {int(k): v for k, v in data.items() if isinstance(v, dict)}
+            for user_id, kind in data.get("queue", []):
+                self.waiting[int(user_id)] = str(kind)
+        except FileNotFoundError:
+            self._state = {}
+        except Exception:
+            self._state = {}
+            self.waiting = {}
+
+        try:
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        op = json.loads(line)
+                        if "q" in op:
+                            self._apply_queue(int(op["q"]), op.get("k"))
+                            self._journal_lines += 1
+                            continue
+                        cid = int(op["c"])
+                    except Exception:
+                        # última linha cortada por crash no meio da escrita
+                        continue
+                    if op.get("s") is None:
+                        self._state.pop(cid, None)
+                    else:
+                        self._state[cid] = op["s"]
+                    self._journal_lines += 1
+        except FileNotFoundError:
+            pass
+
+    def _take_dirty(self) -> Tuple[str, int]:
+        dirty, self._dirty = self._dirty, {}
+        ops, self._queue_ops = self._queue_ops, []
+        lines = "".join(
+            json.dumps({"c": cid, "s": st}, separators=(",", ":"), ensure_ascii=False) + "\n"
+            for cid, st in dirty.items()
+        ) + "".join(
+            json.dumps({"q": uid, "k": kind}, separators=(",", ":"), ensure_ascii=False) + "\n"
+            for uid, kind in ops
+        )
+        return lines, len(dirty) + len(ops)
+
+    async def flush(self) -> None:
+        if not self._dirty and not self._queue_ops:
+            return
+        async with self._flush_lock:
+            lines, n = self._take_dirty()
+            snapshot = None
+            if self._journal_lines + n >= COMPACT_AFTER_LINES:
+                data: Dict[str, Any] = {str(k): v for k, v in self._state.items()}
+                data["queue"] = [[uid, kind] for uid, kind in self.waiting.items()]
+                snapshot = json.dumps(data, ensure_ascii=False)
+            await asyncio.to_thread(self._write, lines, snapshot)
+            self._journal_lines = 0 if snapshot is not None else self._journal_lines + n
+
+    def close(self) -> None:
+        """Flush síncrono para o shutdown."""
+        if not self._dirty and not self._queue_ops:
+            return
+        lines, _ = self._take_dirty()
+        self._write(lines, None)
+
+    def _write(self, lines: str, snapshot: Optional[str]) -> None:
+        with self._io_lock:
+            if snapshot is not None:
+                write_atomic(self.snapshot_path, snapshot, prefix=".tickets-")
+                # o snapshot já contém tudo: journal recomeça vazio
+                with open(self.journal_path, "w", encoding="utf-8") as f:
+                    f.flush()
+                    os.fsync(f.fileno())
+                return
+            with open(self.journal_path, "a", encoding="utf-8") as f:
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
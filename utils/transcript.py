@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import asyncio
+import gzip
+import logging
+import os
+import re
+import shutil
+import tempfile
+import zipfile
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+import aiohttp
+import discord
+
+# folga sobre o limite de upload: o compressor ainda tem bytes no buffer quando medimos
+PART_SAFETY = 0.9
+PART_MARGIN_BYTES = 256 * 1024
+# limite real de upload sem boost (níveis 0 e 1); o discord.py 2.4 ainda informa 25 MiB
+UNBOOSTED_UPLOAD_BYTES = 10 * 1024 * 1024
+
+log = logging.getLogger(__name__)
+
+
+def upload_limit(guild: discord.Guild) -> int:
+    """Maior arquivo que o bot consegue enviar na guild."""
+    if guild.premium_tier < 2:
+        return min(guild.filesize_limit, UNBOOSTED_UPLOAD_BYTES)
+    return guild.filesize_limit
+
+
+class TranscriptSpool:
+    """Transcript de ticket gravado em disco (gzip) conforme as páginas chegam.
+
+    A memória fica constante qualquer que seja o tamanho do ticket: só o buffer
+    do compressor fica em RAM. Quando a parte atual se aproxima de `part_limit`
+    bytes, abre uma nova, para que cada arquivo caiba no limite de upload.
+    """
+
+    def __init__(self, name: str, part_limit: int):
+        self.name = name
+        self.part_limit = max(min(int(part_limit * PART_SAFETY), part_limit - PART_MARGIN_BYTES), 64 * 1024)
+        self.dir = tempfile.mkdtemp(prefix="transcript-")
+        self.paths: List[str] = []
+        self.lines = 0
+        # anexos a arquivar: (msg_id, attachment), limitados pelo orçamento em bytes
+        self.attachments: List[Tuple[int, discord.Attachment]] = []
+        self.attachment_bytes = 0
+        self.attachments_skipped = 0
+        self._raw = None
+        self._gz: Optional[gzip.GzipFile] = None
+        self._open_part()
+
+    def _open_part(self) -> None:
+        path = os.path.join(self.dir, f"{self.name}.part{len(self.paths) + 1}.txt.gz")
+        self._raw = open(path, "wb")
+        self._gz = gzip.GzipFile(filename=os.path.basename(path)[:-3], mode="wb", fileobj=self._raw)
+        self.paths.append(path)
+
+    def _close_part(self) -> None:
+        if self._gz is not None:
+            self._gz.close()
+            self._gz = None
+        if self._raw is not None:
+            self._raw.close()
+            self._raw = None
+
+    def write(self, line: str) -> None:
+        assert self._gz is not None and self._raw is not None
+        self._gz.write(line.encode("utf-8"))
+        self.lines += 1
+        if self._raw.tell() >= self.part_limit:
+            self._close_part()
+            self._open_part()
+
+    def collect(self, msg: discord.Message, budget: int) -> None:
+        for att in msg.attachments:
+            if self.attachment_bytes + att.size > budget:
+                self.attachments_skipped += 1
+                continue
+            self.attachment_bytes += att.size
+            self.attachments.append((msg.id, att))
+
+    def size(self) -> int:
+        return sum(os.path.getsize(p) for p in self.paths if os.path.exists(p))
+
+    def close(self) -> List[str]:
+        """Fecha o spool e devolve os arquivos (.txt.gz) na ordem."""
+        self._close_part()
+        return list(self.paths)
+
+    def filename(self, index: int) -> str:
+        if len(self.paths) == 1:
+            return f"{self.name}.txt.gz"
+        return f"{self.name}.part{index + 1}.txt.gz"
+
+    def cleanup(self) -> None:
+        self._close_part()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+
+def format_line(msg: discord.Message) -> str:
+    line = f"[{msg.created_at.isoformat()}] {msg.author} ({msg.author.id}): {msg.content}"
+    for att in msg.attachments:
+        line += f" [anexo: {_archive_name(msg.id, att)}]"
+    for emb in msg.embeds:
+        text = " ".join(x for x in (emb.title, (emb.description or "").replace("\n", " ")) if x)
+        if text:
+            line += f" [embed: {text}]"
+    return line + "\n"
+
+
+# mensagens por lote entregue ao `on_batch` (uma página do histórico)
+BATCH_MESSAGES = 100
+
+
+async def spool_channel(
+    channel: discord.abc.Messageable,
+    name: str,
+    part_limit: int,
+    attachment_budget: int = 0,
+    on_batch: Optional[Callable[[List[discord.Message]], Awaitable[None]]] = None,
+) -> TranscriptSpool:
+    """Percorre todo o histórico do canal (sem teto de mensagens) gravando no spool.
+
+    Com `attachment_budget` > 0, também anota os anexos que cabem no orçamento
+    para `build_archive`. `on_batch` recebe as mensagens em lotes (ex.: indexação),
+    sem acumular o histórico inteiro. O chamador é responsável por `close()` / `cleanup()`.
+    """
+    spool = TranscriptSpool(name, part_limit)
+    batch: List[discord.Message] = []
+    try:
+        async for msg in channel.history(limit=None, oldest_first=True):
+            spool.write(format_line(msg))
+            if attachment_budget > 0 and msg.attachments:
+                spool.collect(msg, attachment_budget)
+            if on_batch is not None:
+                batch.append(msg)
+                if len(batch) >= BATCH_MESSAGES:
+                    await on_batch(batch)
+                    batch = []
+        if on_batch is not None and batch:
+            await on_batch(batch)
+    except BaseException:
+        spool.cleanup()
+        raise
+    return spool
+
+
+# ----------
+# Arquivo .zip com anexos
+# ----------
+_UNSAFE_NAME = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+def _archive_name(msg_id: int, att: discord.Attachment) -> str:
+    """Nome do anexo dentro do zip (e citado no transcript). O id do anexo evita que
+    dois arquivos com o mesmo nome na mesma mensagem se sobrescrevam."""
+    return f"{msg_id}_{att.id}_{_UNSAFE_NAME.sub('_', att.filename)[:100]}"
+
+
+# pedaço lido por vez no download: o anexo nunca fica inteiro em memória
+DOWNLOAD_CHUNK_BYTES = 64 * 1024
+
+
+async def _download(session: aiohttp.ClientSession, att: discord.Attachment, path: str, sem: asyncio.Semaphore) -> bool:
+    # Attachment.save() lê o arquivo inteiro para a memória antes de gravar; aqui vai em pedaços
+    async with sem:
+        try:
+            async with session.get(att.url) as resp:
+                resp.raise_for_status()
+                with open(path, "wb") as f:
+                    async for chunk in resp.content.iter_chunked(DOWNLOAD_CHUNK_BYTES):
+                        f.write(chunk)
+        except Exception:
+            log.warning("Falha ao baixar anexo %s", att.url)
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            return False
+    return True
+
+
+async def build_archive(spool: TranscriptSpool, parts: List[str], concurrency: int) -> str:
+    """Baixa os anexos em paralelo (no máximo `concurrency` por vez) e monta um .zip
+    com o transcript + anexos no diretório do spool. Devolve o caminho do zip.
+    """
+    att_dir = os.path.join(spool.dir, "anexos")
+    os.makedirs(att_dir, exist_ok=True)
+    sem = asyncio.Semaphore(max(1, concurrency))
+    names = [_archive_name(msg_id, att) for msg_id, att in spool.attachments]
+    async with aiohttp.ClientSession() as session:
+        results = await asyncio.gather(
+            *(_download(session, att, os.path.join(att_dir, n), sem) for (_, att), n in zip(spool.attachments, names))
+        )
+
+    failed = [n for n, ok in zip(names, results) if not ok]
+    manifest = [f"anexos arquivados: {len(names) - len(failed)}"]
+    if failed:
+        manifest.append(f"falha no download: {len(failed)}")
+        manifest.extend(f"  {n}" for n in failed)
+    if spool.attachments_skipped:
+        manifest.append(f"fora do limite de tamanho: {spool.attachments_skipped}")
+
+    zip_path = os.path.join(spool.dir, f"{spool.name}.zip")
+
+    def _zip() -> None:
+        # transcript e mídia já vêm comprimidos: ZIP_STORED evita recomprimir
+        with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_STORED) as zf:
+            for i, path in enumerate(parts):
+                zf.write(path, arcname=spool.filename(i))
+            for n, ok in zip(names, results):
+                if ok:
+                    zf.write(os.path.join(att_dir, n), arcname=f"anexos/{n}")
+            zf.writestr("manifesto.txt", "\n".join(manifest) + "\n", compress_type=zipfile.ZIP_DEFLATED)
+
+    await asyncio.to_thread(_zip)
+    return zip_path